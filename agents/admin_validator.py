@@ -3,41 +3,114 @@ Generic Jira API Executor - Let the LLM call any API it knows about
 """
 
 from typing import Dict, List, Optional, Any
+import base64
+import functools
 import json
-import requests
-import copy
-from datetime import datetime
+import logging
+import re
+import httpx
+import orjson
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 from config import Config
 from ai.ollama_client import call_ollama
+from utils.adf import extract_text
 from utils.logger import get_logger
+from utils.timefmt import iso_now_cached
 
 logger = get_logger(__name__)
 
+# HTTP/2 client shared by all GenericJiraAPI instances: parallel plan steps
+# multiplex over one TLS connection instead of opening one socket each.
+_HTTP2_CLIENT = httpx.Client(
+    http2=True,
+    limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+    timeout=30.0,
+)
+
+@functools.lru_cache(maxsize=8)
+def _basic_auth_header(email: str, token: str) -> str:
+    """Memoized Basic auth header - credentials rarely change within a process"""
+    return "Basic " + base64.b64encode(f"{email}:{token}".encode()).decode()
+
+# Matches context references like {{step_1_id}} / {{step_2_result}}
+_STEP_REF_RE = re.compile(r"\{\{(step_\d+)_\w+\}\}")
+
+# Matches any {{variable}} placeholder for context substitution
+_CTX_RE = re.compile(r"\{\{(\w+)\}\}")
+
+def _validate_plan_response(ai_response: Any) -> Optional[str]:
+    """Validate the AI plan response structure in one pass.
+
+    Returns an error string, or None when the plan is well-formed. Once a
+    response passes, the executor can index steps directly instead of
+    re-probing with defensive .get chains on every access.
+    """
+    if not isinstance(ai_response, dict):
+        return "response is not a JSON object"
+
+    plan = ai_response.get("plan")
+    if not isinstance(plan, list) or not plan:
+        return "missing or empty plan"
+
+    for i, step in enumerate(plan):
+        if not isinstance(step, dict):
+            return f"plan[{i}] is not an object"
+        api_call = step.get("api_call")
+        if not isinstance(api_call, dict):
+            return f"plan[{i}].api_call missing"
+        api_call.setdefault("method", "GET")
+        if not isinstance(api_call["method"], str):
+            return f"plan[{i}].api_call.method is not a string"
+        endpoint = api_call.get("endpoint")
+        if not isinstance(endpoint, str) or not endpoint:
+            return f"plan[{i}].api_call.endpoint missing"
+        if api_call.get("payload") is not None and not isinstance(api_call["payload"], dict):
+            return f"plan[{i}].api_call.payload is not an object"
+        if api_call.get("params") is not None and not isinstance(api_call["params"], dict):
+            return f"plan[{i}].api_call.params is not an object"
+
+    return None
+
+def _resolve_json_pointer(data: Any, pointer: str) -> Any:
+    """Resolve an RFC 6901 JSON pointer like /0/id against parsed JSON"""
+    node = data
+    for token in pointer.lstrip("/").split("/"):
+        token = token.replace("~1", "/").replace("~0", "~")
+        if isinstance(node, list):
+            node = node[int(token)]
+        elif isinstance(node, dict):
+            node = node[token]
+        else:
+            raise KeyError(pointer)
+    return node
+
 class GenericJiraAPI:
     """Generic Jira API that can execute any REST call the LLM requests"""
     
     def __init__(self, config: Config):
         self.base_url = config.jira_base_url.rstrip("/")
-        self.session = requests.Session()
-        
+        # Shared HTTP/2 client; auth stays on per-instance headers
+        self.session = _HTTP2_CLIENT
+        self.headers = {
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+        }
+
         if config.jira_email and config.jira_api_token:
-            import base64
-            credentials = base64.b64encode(f"{config.jira_email}:{config.jira_api_token}".encode()).decode()
-            self.session.headers.update({
-                "Authorization": f"Basic {credentials}",
-                "Accept": "application/json",
-                "Content-Type": "application/json",
-            })
+            self.headers["Authorization"] = _basic_auth_header(config.jira_email, config.jira_api_token)
         elif config.jira_bearer_token:
-            self.session.headers.update({
-                "Authorization": f"Bearer {config.jira_bearer_token}",
-                "Accept": "application/json", 
-                "Content-Type": "application/json",
-            })
+            self.headers["Authorization"] = f"Bearer {config.jira_bearer_token}"
     
-    def execute_api_call(self, method: str, endpoint: str, payload: Dict = None, params: Dict = None) -> Dict:
-        """Execute arbitrary Jira REST API calls"""
+    def execute_api_call(self, method: str, endpoint: str, payload: Dict = None, params: Dict = None,
+                         extract_pointers: Optional[List[str]] = None) -> Dict:
+        """Execute arbitrary Jira REST API calls.
+
+        extract_pointers takes JSON pointers (e.g. ["/0/id"]); when given, only
+        those targets are returned as data instead of the full response tree,
+        so multi-MB list endpoints don't get dragged through step context.
+        """
         try:
             # Construct full URL
             if endpoint.startswith('http'):
@@ -46,24 +119,35 @@ class GenericJiraAPI:
                 url = f"{self.base_url}{endpoint}"
             
             logger.info(f"API Call: {method} {endpoint}")
-            if payload:
-                logger.debug(f"Payload: {json.dumps(payload, indent=2)}")
-            
-            # Make the API call
+            # Only serialize the pretty-printed payload when DEBUG is actually on
+            if payload and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Payload: %s", orjson.dumps(payload, option=orjson.OPT_INDENT_2).decode())
+
+            # Make the API call (pre-serialized body skips the stdlib-json path)
             response = self.session.request(
                 method=method.upper(),
                 url=url,
-                json=payload if payload else None,
+                headers=self.headers,
+                content=orjson.dumps(payload) if payload else None,
                 params=params if params else None
             )
-            
+
             logger.info(f"Response: {response.status_code}")
-            
+
             # Return structured response
             try:
-                response_data = response.json() if response.text else {}
-            except:
+                response_data = orjson.loads(response.content) if response.content else {}
+            except Exception:
                 response_data = {"raw_response": response.text}
+
+            if extract_pointers and not isinstance(response_data, str):
+                extracted = {}
+                for pointer in extract_pointers:
+                    try:
+                        extracted[pointer] = _resolve_json_pointer(response_data, pointer)
+                    except (KeyError, IndexError, ValueError, TypeError):
+                        extracted[pointer] = None
+                response_data = extracted
             
             return {
                 "success": response.status_code < 400,
@@ -85,7 +169,7 @@ class UnrestrictedJiraAgent:
     def __init__(self, config: Config):
         self.config = config
         self.jira = GenericJiraAPI(config)
-        
+
         # System prompt with concrete API examples to prevent reasoning loops
         self.system_prompt = """You are a Jira administrator with access to tested API endpoints. Use ONLY these endpoints:
 
@@ -152,7 +236,7 @@ Focus on business logic. Don't question the API endpoints - they work. Keep plan
         fields = issue_data.get("fields") or {}
         
         summary = fields.get("summary") or ""
-        description = self._extract_description_text(fields.get("description"))
+        description = extract_text(fields.get("description"))
         full_request = f"{summary}\n\n{description}".strip()
         
         logger.info(f"Processing unrestricted request: {issue_key}")
@@ -162,9 +246,10 @@ Focus on business logic. Don't question the API endpoints - they work. Keep plan
             # Get the AI's execution plan
             ai_response = call_ollama(full_request, self.system_prompt, self.config)
             
-            if not isinstance(ai_response, dict) or "plan" not in ai_response:
-                logger.error("AI failed to create valid execution plan")
-                return {"error": "AI failed to create execution plan", "raw_response": ai_response}
+            plan_error = _validate_plan_response(ai_response)
+            if plan_error:
+                logger.error(f"AI failed to create valid execution plan: {plan_error}")
+                return {"error": f"AI failed to create execution plan ({plan_error})", "raw_response": ai_response}
             
             logger.info(f"AI Understanding: {ai_response.get('understanding')}")
             logger.info(f"Plan has {len(ai_response.get('plan', []))} steps")
@@ -174,8 +259,8 @@ Focus on business logic. Don't question the API endpoints - they work. Keep plan
             if safety_checks:
                 logger.warning(f"Safety checks needed: {safety_checks}")
                 # Block DELETE operations without confirmation
-                for step in ai_response.get("plan", []):
-                    if step.get("api_call", {}).get("method") == "DELETE":
+                for step in ai_response["plan"]:
+                    if step["api_call"]["method"] == "DELETE":
                         return {
                             "status": "blocked",
                             "reason": "DELETE operation requires explicit confirmation",
@@ -183,51 +268,9 @@ Focus on business logic. Don't question the API endpoints - they work. Keep plan
                             "plan": ai_response.get("plan")
                         }
             
-            # Execute the plan
-            execution_results = []
-            context = {}  # Store values between steps (like field IDs)
-            
-            for step in ai_response.get("plan", []):
-                step_num = step.get("step", len(execution_results) + 1)
-                logger.info(f"Executing step {step_num}: {step.get('description')}")
-                
-                api_call = step.get("api_call", {})
-                
-                # Replace any context variables in the API call
-                api_call = self._substitute_context_variables(api_call, context)
-                
-                # Execute the API call
-                result = self.jira.execute_api_call(
-                    method=api_call.get("method", "GET"),
-                    endpoint=api_call.get("endpoint", ""),
-                    payload=api_call.get("payload"),
-                    params=api_call.get("params")
-                )
-                
-                # Store important values in context for next steps
-                if result.get("success"):
-                    data = result.get("data", {})
-                    if "id" in data:
-                        context[f"step_{step_num}_id"] = data["id"]
-                    if "key" in data:
-                        context[f"step_{step_num}_key"] = data["key"]
-                    # Store the whole result for complex references
-                    context[f"step_{step_num}_result"] = data
-                    
-                    logger.info(f"Step {step_num} successful, stored context: {list(context.keys())}")
-                
-                execution_results.append({
-                    "step": step_num,
-                    "description": step.get("description"),
-                    "success": result.get("success", False),
-                    "result": result
-                })
-                
-                # Stop on first failure
-                if not result.get("success"):
-                    logger.error(f"Step {step_num} failed: {result.get('error')}")
-                    break
-            
+            # Execute the plan (independent steps fan out in parallel)
+            execution_results = self._execute_plan(ai_response["plan"])
+
             # Post results comment
             self._post_results_comment(issue_key, ai_response, execution_results)
             
@@ -240,80 +283,168 @@ Focus on business logic. Don't question the API endpoints - they work. Keep plan
                 "steps_completed": len([r for r in execution_results if r.get("success")]),
                 "total_steps": len(ai_response.get("plan", [])),
                 "expected_outcome": ai_response.get("expected_outcome"),
-                "timestamp": datetime.now().isoformat()
+                "timestamp": iso_now_cached()
             }
             
         except Exception as e:
             logger.error(f"Error in unrestricted processing: {e}")
             return {"error": str(e), "issueKey": issue_key}
     
+    def _step_predecessors(self, api_call: Dict) -> set:
+        """Find the step numbers an api_call depends on via {{step_N_*}} references"""
+        refs = _STEP_REF_RE.findall(json.dumps(api_call))
+        return {int(ref.split("_")[1]) for ref in refs}
+
+    def _execute_plan(self, plan: List[Dict]) -> List[Dict]:
+        """Execute plan steps, running steps with no unmet dependencies in parallel.
+
+        A step that references {{step_N_*}} context waits for step N to complete;
+        everything else is submitted to a thread pool immediately. Execution stops
+        launching new steps after the first failure (in-flight steps still finish).
+        """
+        steps = {}
+        for i, step in enumerate(plan):
+            steps[step.get("step", i + 1)] = step
+
+        # Only count predecessors that actually exist in the plan
+        predecessors = {
+            num: self._step_predecessors(step["api_call"]) & set(steps)
+            for num, step in steps.items()
+        }
+
+        context = {}  # Store values between steps (like field IDs)
+        context_lock = threading.Lock()
+        results: Dict[int, Dict] = {}
+
+        def run_step(step_num: int) -> Dict:
+            step = steps[step_num]
+            logger.info(f"Executing step {step_num}: {step.get('description')}")
+
+            with context_lock:
+                api_call = self._substitute_context_variables(step["api_call"], context)
+
+            result = self.jira.execute_api_call(
+                method=api_call["method"],
+                endpoint=api_call["endpoint"],
+                payload=api_call.get("payload"),
+                params=api_call.get("params")
+            )
+
+            # Store important values in context for dependent steps
+            if result.get("success"):
+                data = result.get("data", {})
+                with context_lock:
+                    if "id" in data:
+                        context[f"step_{step_num}_id"] = data["id"]
+                    if "key" in data:
+                        context[f"step_{step_num}_key"] = data["key"]
+                    # Store the whole result for complex references
+                    context[f"step_{step_num}_result"] = data
+                    logger.info(f"Step {step_num} successful, stored context: {list(context.keys())}")
+
+            return result
+
+        max_workers = getattr(self.config, "async_workers", None) or 5
+        pending = set(steps)
+        failed = False
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            running = {}  # future -> step_num
+            while pending or running:
+                if not failed:
+                    ready = [num for num in sorted(pending) if predecessors[num] <= set(results)]
+                    for num in ready:
+                        pending.discard(num)
+                        running[executor.submit(run_step, num)] = num
+
+                if not running:
+                    # Remaining steps are blocked on a failed/missing predecessor
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step_num = running.pop(future)
+                    result = future.result()
+                    results[step_num] = result
+
+                    # Stop on first failure
+                    if not result.get("success"):
+                        logger.error(f"Step {step_num} failed: {result.get('error')}")
+                        failed = True
+
+        return [
+            {
+                "step": step_num,
+                "description": steps[step_num].get("description"),
+                "success": results[step_num].get("success", False),
+                "result": results[step_num]
+            }
+            for step_num in sorted(results)
+        ]
+
     def _substitute_context_variables(self, api_call: Dict, context: Dict) -> Dict:
-        """Replace context variables like {{step_1_id}} with actual values"""
+        """Replace context variables like {{step_1_id}} with actual values.
+
+        The input api_call is never mutated: branches containing a substitution
+        are rebuilt functionally, untouched branches are shared as-is, so no
+        up-front deepcopy is needed.
+        """
         if not context:
             return api_call
-            
-        result = copy.deepcopy(api_call)
-        
+
         def replace_in_value(value):
-            if isinstance(value, str) and "{{" in value and "}}" in value:
-                for key, ctx_value in context.items():
-                    placeholder = "{{" + key + "}}"
-                    if placeholder in value:
-                        # Replace the entire string if it's just the placeholder
-                        if value.strip() == placeholder:
-                            return ctx_value
-                        else:
-                            value = value.replace(placeholder, str(ctx_value))
-                return value
+            if isinstance(value, str):
+                if "{{" not in value:
+                    return value
+                # Replace the entire string if it's just the placeholder
+                # (preserves non-string context values like dicts/ints)
+                whole = _CTX_RE.fullmatch(value.strip())
+                if whole and whole.group(1) in context:
+                    return context[whole.group(1)]
+                return _CTX_RE.sub(lambda m: str(context.get(m.group(1), m.group(0))), value)
             elif isinstance(value, dict):
-                return {k: replace_in_value(v) for k, v in value.items()}
+                new = {k: replace_in_value(v) for k, v in value.items()}
+                return new if any(new[k] is not v for k, v in value.items()) else value
             elif isinstance(value, list):
-                return [replace_in_value(item) for item in value]
+                new = [replace_in_value(item) for item in value]
+                return new if any(a is not b for a, b in zip(new, value)) else value
             return value
-        
-        return replace_in_value(result)
-    
-    def _extract_description_text(self, description_obj: Any) -> str:
-        """Extract plain text from Jira description"""
-        if not description_obj:
-            return ""
-        if isinstance(description_obj, str):
-            return description_obj
-        if isinstance(description_obj, dict):
-            text = []
-            for block in (description_obj.get("content") or []):
-                if block.get("type") == "paragraph":
-                    for item in (block.get("content") or []):
-                        if item.get("type") == "text":
-                            text.append(item.get("text", ""))
-            return "".join(text)
-        return str(description_obj)
+
+        return replace_in_value(api_call)
     
     def _post_results_comment(self, issue_key: str, ai_response: Dict, execution_results: List[Dict]):
         """Post a comment showing what was accomplished"""
         try:
             successful_steps = len([r for r in execution_results if r.get("success")])
             total_steps = len(execution_results)
-            
-            comment = f"Admin request completed: {successful_steps}/{total_steps} steps successful\n\n"
-            comment += f"**Understanding:** {ai_response.get('understanding', 'N/A')}\n\n"
-            
+
+            # Assemble lines in a list and join once - linear even on long plans
+            parts = [
+                f"Admin request completed: {successful_steps}/{total_steps} steps successful",
+                "",
+                f"**Understanding:** {ai_response.get('understanding', 'N/A')}",
+                ""
+            ]
+
             for result in execution_results:
-                step_num = result.get("step")
-                desc = result.get("description")
                 success = result.get("success", False)
-                
                 status = "✅" if success else "❌"
-                comment += f"{status} Step {step_num}: {desc}\n"
-                
+                parts.append(f"{status} Step {result.get('step')}: {result.get('description')}")
+
                 if not success:
                     error = result.get("result", {}).get("error", "Unknown error")
-                    comment += f"   Error: {error}\n"
-            
+                    parts.append(f"   Error: {error}")
+
             if ai_response.get("expected_outcome"):
-                comment += f"\n**Expected Result:** {ai_response['expected_outcome']}"
-            
-            # Post the comment
+                parts.append("")
+                parts.append(f"**Expected Result:** {ai_response['expected_outcome']}")
+
+            comment = "\n".join(parts)
+
+            # Built fresh per call: the one agent instance serves concurrent
+            # worker threads, so a shared mutable ADF wrapper could post one
+            # ticket's results onto another. Four dict allocations are
+            # negligible next to the HTTP POST.
             self.jira.execute_api_call(
                 method="POST",
                 endpoint=f"/rest/api/3/issue/{issue_key}/comment",
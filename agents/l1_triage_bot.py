@@ -1,24 +1,185 @@
 # L1 Triage Bot with REAL Trend Detection
 # Looks at tickets from last 30 minutes, finds commonalities, alerts on trends
 
+import asyncio
+import heapq
 import json
 import logging
+import os
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
 import requests
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
 from typing import Dict, List, Optional, Any
 
+from ai.semantic_cache import SemanticCache
+from jira.api import JiraAPI
+from utils.adf import extract_text
+from utils.timefmt import minute_now_cached
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(levelname)s | %(name)s | %(message)s')
 logger = logging.getLogger(__name__)
 
-class L1TriageBot:
-    def __init__(self, config):
-        self.config = config
-        self.ollama_url = "http://127.0.0.1:11434/api/generate"
-        self.model = config.model
+# Keep-alive session for Ollama calls - reuses the TCP connection across
+# tickets instead of paying a fresh handshake per inference. Shared by the
+# single-ticket and batched analysis paths; Jira traffic pools separately
+# through jira.api.SHARED_SESSION
+_OLLAMA_SESSION = requests.Session()
+_OLLAMA_SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+_OLLAMA_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
+# Near-duplicate tickets (incident storms) reuse a prior triage verdict instead
+# of paying 10-20s of inference again. Looser threshold than the planning cache
+# since triage output is coarse-grained.
+_TRIAGE_CACHE = SemanticCache(threshold=0.85, ttl_seconds=2 * 60 * 60, max_entries=2048)
+
+def _text(text: str, *marks: str) -> Dict:
+    """ADF text run with optional marks ("strong", "em")"""
+    return {"type": "text", "text": text, "marks": [{"type": m} for m in marks]}
+
+
+def _para(*content: Dict) -> Dict:
+    """ADF paragraph wrapping the given text runs"""
+    return {"type": "paragraph", "content": list(content)}
+
+
+def _list_item(text: str) -> Dict:
+    """ADF list item holding a single plain-text paragraph"""
+    return {"type": "listItem", "content": [_para(_text(text))]}
+
+
+def _fit_num_ctx(prompt_chars: int, num_predict: int) -> int:
+    """Smallest power-of-two context that fits the prompt plus generation.
+
+    KV-cache cost is linear in num_ctx, so a ~500-token triage prompt should
+    not allocate a 4096-token window. Roughly 3 chars/token, plus headroom.
+    """
+    needed = prompt_chars // 3 + num_predict + 128
+    ctx = 1024
+    while ctx < needed:
+        ctx *= 2
+    return min(ctx, 16384)
+
+
+def _safe(d: Any, *path: str, default: Any = "") -> Any:
+    """Walk a nested dict path with one lookup per level, None-safe.
+
+    Jira sends explicit null for empty fields (priority, assignee), which
+    breaks .get(..., {}).get(...) chains - and those chains also look each
+    key up twice when guarded with a ternary.
+    """
+    for key in path:
+        if not isinstance(d, dict):
+            return default
+        d = d.get(key)
+    return default if d is None else d
+
+
+# Terminal statuses need no triage; exact hash lookup against the casefolded
+# status name beats substring scans and skips the whole Ollama round trip
+_SKIP_STATUSES = frozenset({"done", "closed", "resolved", "cancelled"})
+
+# Keyword extraction tables - built once at import instead of per call
+_WORD_RE = re.compile(r'\b[a-zA-Z0-9]{3,}\b')
+_STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by',
+    'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did',
+    'will', 'would', 'could', 'should', 'can', 'may', 'might', 'this', 'that', 'these', 'those',
+    'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her', 'us', 'them', 'my', 'your',
+    'his', 'our', 'their', 'please', 'need', 'needs', 'unable', 'issue', 'problem', 'help'
+})
+
+# C-implemented decoder for pulling the JSON object out of AI responses;
+# raw_decode stops at the end of the first complete object and handles
+# quoting/escapes that a greedy regex gets wrong on nested braces
+_JSON_DECODER = json.JSONDecoder()
+
+
+class _TrendIndex:
+    """Background-refreshed snapshot of recent tickets for trend detection.
+
+    One batched JQL every couple of minutes replaces the per-webhook search:
+    _detect_trends reads this in-memory snapshot (per-ticket keyword sets
+    plus a keyword -> ticket keys inverted index) instead of paying a Jira
+    round trip and re-extracting keywords on every incoming ticket.
+    """
+
+    REFRESH_SECONDS = 30
+
+    def __init__(self, search_recent, extract_keywords):
+        self._search_recent = search_recent
+        self._extract_keywords = extract_keywords
+        self._lock = threading.Lock()
+        self._tickets: List[Dict] = []
+        self._by_key: Dict[str, Dict] = {}
+        self._keyword_index: Dict[str, List[str]] = {}
+        self.ready = threading.Event()
+
+    def start(self) -> None:
+        thread = threading.Thread(target=self._run, daemon=True, name="trend-index")
+        thread.start()
 
-        self.system_prompt = """You are an expert L1 support agent who triages IT/software tickets for immediate action.
+    def _run(self) -> None:
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error("Trend index refresh failed: %s", e)
+            time.sleep(self.REFRESH_SECONDS)
+
+    def refresh(self) -> None:
+        tickets = self._search_recent(minutes=30)
+        with self._lock:
+            prev = self._by_key
+        keyword_index: Dict[str, List[str]] = {}
+        for ticket in tickets:
+            # Successive refreshes mostly see the same tickets; reuse the
+            # previous cycle's token set when the text hasn't changed
+            old = prev.get(ticket["key"])
+            if (old is not None
+                    and old.get("summary") == ticket.get("summary")
+                    and old.get("description") == ticket.get("description")):
+                keywords = old["keywords"]
+            else:
+                keywords = set(self._extract_keywords(
+                    f"{ticket.get('summary', '')} {ticket.get('description', '')}"
+                ))
+            ticket["keywords"] = keywords
+            for keyword in keywords:
+                keyword_index.setdefault(keyword, []).append(ticket["key"])
+        with self._lock:
+            self._tickets = tickets
+            self._by_key = {ticket["key"]: ticket for ticket in tickets}
+            self._keyword_index = keyword_index
+        self.ready.set()
+
+    def snapshot(self):
+        with self._lock:
+            return self._tickets, self._by_key, self._keyword_index
+
+
+_TREND_INDEX: Optional[_TrendIndex] = None
+_TREND_INDEX_LOCK = threading.Lock()
+
+
+def _get_trend_index(search_recent, extract_keywords) -> _TrendIndex:
+    """Create the shared trend index on first use and start its refresher."""
+    global _TREND_INDEX
+    with _TREND_INDEX_LOCK:
+        if _TREND_INDEX is None:
+            _TREND_INDEX = _TrendIndex(search_recent, extract_keywords)
+            _TREND_INDEX.start()
+        return _TREND_INDEX
+
+class L1TriageBot:
+    # Built once at class definition; sent through Ollama's "system" field so
+    # the server can reuse the cached KV prefix for this constant across calls
+    SYSTEM_PROMPT = """You are an expert L1 support agent who triages IT/software tickets for immediate action.
 Your job is to analyze tickets and provide:
 1. Assessment of complexity level (L1 doable vs escalation needed)
 2. Immediate action steps OR information needed
@@ -58,81 +219,265 @@ Escalate when:
 
 Be concise but helpful. Focus on actionable next steps."""
 
+    def __init__(self, config):
+        self.config = config
+        self.ollama_url = "http://127.0.0.1:11434/api/generate"
+        self.model = config.model
+        self.system_prompt = self.SYSTEM_PROMPT
+
+        # One Jira client per bot - auth setup happens once and comments and
+        # searches reuse the shared keep-alive session instead of rebuilding
+        # a client per ticket
+        self._jira = JiraAPI(config)
+
+        # Triage is I/O-dominated (Ollama inference + Jira round trips), so
+        # batches fan out across threads; sessions and the Jira client are
+        # thread-safe and Ollama queues concurrent generations
+        self._pool = ThreadPoolExecutor(
+            max_workers=min(16, (os.cpu_count() or 4) * 4),
+            thread_name_prefix="l1-triage",
+        )
+
+        # Comment writes don't gate the triage verdict, so they run on a
+        # small I/O pool and overlap with the next ticket's inference;
+        # _post_triage_comment logs its own failures
+        self._io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="l1-io")
+
+        # Warm the model off the request path so the first ticket of a burst
+        # doesn't pay the multi-second load; an empty prompt just loads and
+        # pins the model for keep_alive
+        self._io_pool.submit(self._warm_model)
+
+        # Webhook bursts re-fire for the same issue (status change, comment,
+        # label edit); memoize the formatted context keyed on (key, updated)
+        # so unchanged issues skip re-extraction. The updated stamp is the
+        # invalidation token - edits miss the cache.
+        self._context_memo: Dict[tuple, tuple] = {}
+
+        # Short-TTL cache for recent-ticket searches: concurrent batch paths
+        # that bypass the background index reuse one JQL result instead of
+        # issuing identical searches within seconds
+        self._recent_cache: tuple = (0.0, 0, [])
+
         logger.info("L1TriageBot initialized")
 
+    def _warm_model(self) -> None:
+        """Load the model into memory and pin it for the keep_alive window"""
+        try:
+            _OLLAMA_SESSION.post(self.ollama_url, json={
+                "model": self.model,
+                "prompt": "",
+                "stream": False,
+                "keep_alive": "30m",
+            }, timeout=10)
+            logger.info("Warmed AI model %s", self.model)
+        except Exception as e:
+            logger.warning("Model warmup failed (will load on first call): %s", e)
+
     def process_ticket(self, issue_key: str, context: Dict) -> Dict:
         """Main processing method - analyze ticket and detect trends"""
         try:
-            logger.info(f"L1 Triage processing: {issue_key}")
-            
+            logger.info("L1 Triage processing: %s", issue_key)
+
+            # Terminal tickets (closed during webhook delivery, bulk
+            # transitions) skip triage before any extraction or AI work
+            status_name = _safe(context, "issue", "fields", "status", "name")
+            if status_name.casefold() in _SKIP_STATUSES:
+                logger.info("Skipping %s - status '%s' needs no triage", issue_key, status_name)
+                return {"result": "l1_triage_skipped", "reason": f"status {status_name}"}
+
             # Extract issue context
-            issue_context = self._extract_issue_context(context)
-            
-            if not issue_context:
-                logger.error(f"Could not extract issue context for {issue_key}")
+            texts = self._extract_issue_texts(context)
+
+            if not texts or not texts[0]:
+                logger.error("Could not extract issue context for %s", issue_key)
                 return {"result": "l1_triage_failed", "error": "No context"}
-            
-            logger.info(f"Extracted context for {issue_key} ({len(str(issue_context))} chars)")
-            
+
+            issue_context, keyword_text = texts
+            logger.info("Extracted context for %s (%d chars)", issue_key, len(issue_context))
+
             # STEP 1: Detect trends (boss's original request)
-            trend_analysis = self._detect_trends(issue_key, issue_context)
+            trend_analysis = self._detect_trends(issue_key, keyword_text)
             
             # STEP 2: Perform L1 triage
             triage_result = self._analyze_with_ai(issue_context, trend_analysis)
             
             if "error" in triage_result:
-                logger.error(f"AI analysis failed for {issue_key}: {triage_result['error']}")
+                logger.error("AI analysis failed for %s: %s", issue_key, triage_result["error"])
                 return {"result": "l1_triage_failed", "error": triage_result["error"]}
             
-            # STEP 3: Post comprehensive comment
-            comment_posted = self._post_triage_comment(issue_key, triage_result, trend_analysis)
-            
-            logger.info(f"Triage complete for {issue_key}")
-            logger.info(f"   Level: {triage_result.get('triage_level', 'unknown')}")
-            logger.info(f"   Confidence: {triage_result.get('confidence', 0)}")
+            # STEP 3: Post comprehensive comment (fire-and-forget - the
+            # verdict doesn't depend on the Jira write landing first)
+            self._io_pool.submit(self._post_triage_comment, issue_key, triage_result, trend_analysis)
+            comment_posted = "queued"
+
+            logger.info("Triage complete for %s", issue_key)
+            logger.info("   Level: %s", triage_result.get("triage_level", "unknown"))
+            logger.info("   Confidence: %s", triage_result.get("confidence", 0))
             
-            return {
+            result = {
                 "result": "l1_triage_complete",
                 "triage_level": triage_result.get("triage_level"),
                 "confidence": triage_result.get("confidence"),
                 "trends_detected": trend_analysis.get("trends_detected", False),
                 "comment_posted": comment_posted
             }
+            # Full payloads only on request - the detail already lives in the
+            # Jira comment, and serializing it per webhook is wasted egress
+            if getattr(self.config, "verbose_response", False):
+                result["triage_analysis"] = triage_result
+                result["trend_analysis"] = trend_analysis
+            return result
             
         except Exception as e:
-            logger.error(f"L1 Triage processing failed for {issue_key}: {e}")
-            import traceback
-            logger.error(f"Full traceback: {traceback.format_exc()}")
+            logger.error("L1 Triage processing failed for %s: %s", issue_key, e)
+            if logger.isEnabledFor(logging.ERROR):
+                import traceback
+                logger.error("Full traceback: %s", traceback.format_exc())
             return {"result": "l1_triage_failed", "error": str(e)}
 
+    async def process_ticket_async(self, issue_key: str, context: Dict) -> Dict:
+        """Awaitable triage for async callers - runs off the event loop."""
+        return await asyncio.to_thread(self.process_ticket, issue_key, context)
+
+    async def process_many(self, tickets: List[tuple], max_concurrency: int = 8) -> List[Dict]:
+        """Triage many (issue_key, context) pairs from an event loop.
+
+        Bounded by a semaphore so a trend burst can't swamp Ollama's queue;
+        raise OLLAMA_NUM_PARALLEL server-side to get true overlap.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(issue_key: str, context: Dict) -> Dict:
+            async with semaphore:
+                return await self.process_ticket_async(issue_key, context)
+
+        return await asyncio.gather(*(run(k, c) for k, c in tickets))
+
+    def process_batch(self, tickets: List[tuple]) -> List[Dict]:
+        """Triage many (issue_key, context) pairs concurrently.
+
+        Useful for trend bursts where dozens of tickets arrive within
+        seconds - results come back in input order.
+        """
+        futures = [self._pool.submit(self.process_ticket, issue_key, context)
+                   for issue_key, context in tickets]
+        return [future.result() for future in futures]
+
+    def process_tickets_batch(self, tickets: List[tuple]) -> List[Dict]:
+        """Triage a burst of tickets with a single batched Ollama call.
+
+        All contexts go into one prompt asking for a JSON array, so the
+        system-prompt prefill and per-request overhead amortize across the
+        batch. Falls back to the per-ticket thread-pool path if the batched
+        response does not parse into one object per ticket.
+        """
+        texts = [self._extract_issue_texts(context) or ("", "")
+                 for _, context in tickets]
+        contexts = [t[0] for t in texts]
+
+        triage_results = self._analyze_batch_with_ai(contexts) if len(tickets) > 1 else None
+        if triage_results is None:
+            return self.process_batch(tickets)
+
+        results = []
+        for (issue_key, _), (_, keyword_text), triage_result in zip(tickets, texts, triage_results):
+            trend_analysis = self._detect_trends(issue_key, keyword_text)
+            self._io_pool.submit(self._post_triage_comment, issue_key, triage_result, trend_analysis)
+            results.append({
+                "result": "l1_triage_complete",
+                "triage_level": triage_result.get("triage_level"),
+                "confidence": triage_result.get("confidence"),
+                "trends_detected": trend_analysis.get("trends_detected", False),
+                "comment_posted": "queued"
+            })
+        return results
+
+    def _analyze_batch_with_ai(self, contexts: List[str]) -> Optional[List[Dict]]:
+        """One generate call covering many contexts; None on any mismatch"""
+        try:
+            blocks = "\n---\n".join(contexts)
+            prompt = (f"Analyze the following {len(contexts)} support tickets for L1 triage. "
+                      "Return ONLY a JSON array with one triage object per ticket, in order.\n\n"
+                      f"{blocks}\n\nRespond with the JSON array only:")
+
+            logger.info("Calling AI model %s with batch of %d tickets", self.model, len(contexts))
+
+            num_predict = 800 * len(contexts)
+            payload = orjson.dumps({
+                "model": self.model,
+                "system": self.system_prompt,
+                "prompt": prompt,
+                "stream": False,
+                "keep_alive": "30m",
+                "options": {
+                    "temperature": 0.1,
+                    "top_p": 0.9,
+                    "num_predict": num_predict,
+                    "stop": ["```", "\n\n\n"],
+                    "num_ctx": _fit_num_ctx(len(self.system_prompt) + len(prompt), num_predict)
+                }
+            })
+            response = _OLLAMA_SESSION.post(
+                self.ollama_url, data=payload,
+                headers={"Content-Type": "application/json"},
+                timeout=300,
+            )
+            response.raise_for_status()
+            ai_text = orjson.loads(response.content).get("response", "")
+
+            start = ai_text.find('[')
+            if start < 0:
+                logger.error("No JSON array found in batch AI response")
+                return None
+            try:
+                parsed, _ = _JSON_DECODER.raw_decode(ai_text, start)
+            except json.JSONDecodeError as e:
+                logger.error("Batch JSON decode error: %s", e)
+                return None
+
+            if (not isinstance(parsed, list) or len(parsed) != len(contexts)
+                    or not all(isinstance(item, dict) for item in parsed)):
+                logger.error("Batch AI response shape mismatch - falling back to per-ticket")
+                return None
+            return parsed
+
+        except Exception as e:
+            logger.error("Batch AI analysis failed: %s", e)
+            return None
+
     def _extract_issue_context(self, context: Dict) -> Optional[str]:
         """Extract and format issue context for AI analysis"""
+        texts = self._extract_issue_texts(context)
+        return texts[0] if texts else None
+
+    def _extract_issue_texts(self, context: Dict) -> Optional[tuple]:
+        """Return (formatted AI context, raw keyword text) for an issue.
+
+        The keyword text is just summary + description, handed straight to
+        trend detection so it never has to re-parse the formatted blob.
+        """
         try:
             issue = context.get("issue", {})
             fields = issue.get("fields", {})
-            
+
+            memo_key = (issue.get("key"), fields.get("updated") or fields.get("created"))
+            if all(memo_key):
+                cached = self._context_memo.get(memo_key)
+                if cached is not None:
+                    return cached
+
             # Get basic fields
             summary = fields.get("summary", "")
-            issue_type = fields.get("issuetype", {}).get("name", "")
-            priority = fields.get("priority", {}).get("name", "")
-            project = fields.get("project", {}).get("key", "")
+            issue_type = _safe(fields, "issuetype", "name")
+            priority = _safe(fields, "priority", "name")
+            project = _safe(fields, "project", "key")
             
-            # Extract description
-            description = ""
-            desc_obj = fields.get("description")
-            if desc_obj:
-                if isinstance(desc_obj, dict) and "content" in desc_obj:
-                    # ADF format
-                    for block in desc_obj.get("content", []):
-                        if block.get("type") == "paragraph":
-                            for content in block.get("content", []):
-                                if content.get("type") == "text":
-                                    description += content.get("text", "")
-                elif isinstance(desc_obj, str):
-                    description = desc_obj
+            # Extract description (plain string or ADF)
+            description = extract_text(fields.get("description"))
             
             # Get reporter info
-            reporter = fields.get("reporter", {}).get("displayName", "Unknown")
+            reporter = _safe(fields, "reporter", "displayName", default="Unknown")
             
             # Format context
             context_text = f"""TICKET: {issue.get('key', 'UNKNOWN')}
@@ -146,25 +491,47 @@ SUMMARY: {summary}
 DESCRIPTION:
 {description}
 
-STATUS: {fields.get('status', {}).get('name', 'Unknown')}
+STATUS: {_safe(fields, 'status', 'name', default='Unknown')}
 CREATED: {fields.get('created', '')}"""
 
-            return context_text
-            
+            texts = (context_text, f"{summary} {description}".strip())
+
+            if all(memo_key):
+                if len(self._context_memo) >= 4096:
+                    self._context_memo.clear()
+                self._context_memo[memo_key] = texts
+
+            return texts
+
         except Exception as e:
-            logger.error(f"Error extracting issue context: {e}")
+            logger.error("Error extracting issue context: %s", e)
             return None
 
-    def _detect_trends(self, current_issue_key: str, current_context: str) -> Dict:
-        """REAL trend detection - boss's original request implementation"""
+    def _detect_trends(self, current_issue_key: str, keyword_text: str) -> Dict:
+        """REAL trend detection - boss's original request implementation.
+
+        Candidates come off the shared inverted index (keyword -> ticket
+        keys), so cost scales with the posting lists for the current
+        ticket's keywords rather than with every recent ticket; Jaccard is
+        only computed for tickets already sharing two or more keywords.
+        """
         try:
             logger.info("Starting trend detection analysis...")
-            
-            # Search for recent tickets (last 30 minutes as requested)
-            recent_tickets = self._search_recent_tickets(minutes=30)
-            
+
+            # Read the background-refreshed index (last 30 minutes as
+            # requested) instead of searching Jira per webhook
+            index = _get_trend_index(self._search_recent_tickets, self._extract_keywords_from_text)
+            recent_tickets, tickets_by_key, keyword_index = index.snapshot()
+
+            if not recent_tickets and not index.ready.is_set():
+                # First webhook before the background refresh lands
+                index.refresh()
+                recent_tickets, tickets_by_key, keyword_index = index.snapshot()
+
+            # Bail before tokenizing the current ticket - on the quiet path
+            # this skips the regex + stop-word pass entirely
             if len(recent_tickets) < 2:
-                logger.info(f"Only {len(recent_tickets)} recent tickets found - insufficient for trend analysis")
+                logger.info("Only %d recent tickets found - insufficient for trend analysis", len(recent_tickets))
                 return {
                     "trends_detected": False,
                     "analysis_timeframe": "last 30 minutes",
@@ -172,38 +539,49 @@ CREATED: {fields.get('created', '')}"""
                     "reason": "Insufficient recent tickets for pattern analysis"
                 }
             
-            logger.info(f"Analyzing {len(recent_tickets)} recent tickets for trends...")
+            logger.info("Analyzing %d recent tickets for trends...", len(recent_tickets))
             
             # Extract keywords from current ticket
-            current_keywords = self._extract_keywords_from_context(current_context)
-            
-            # Find similar tickets
-            similar_tickets = []
+            current_keywords = self._extract_keywords_from_text(keyword_text)
+            current_set = set(current_keywords)
+
+            # Sparse scoring: accumulate per-ticket overlap counts off the
+            # inverted index, so only tickets sharing at least one keyword
+            # are ever touched - the set-loop equivalent of a sparse
+            # matrix-vector product over the keyword space
             trending_patterns = {}
-            
-            for ticket in recent_tickets:
-                if ticket.get("key") == current_issue_key:
-                    continue  # Skip the current ticket
-                
-                ticket_keywords = self._extract_keywords_from_text(
-                    f"{ticket.get('summary', '')} {ticket.get('description', '')}"
-                )
-                
-                # Calculate similarity
-                common_keywords = set(current_keywords).intersection(set(ticket_keywords))
-                
-                if len(common_keywords) >= 2:  # At least 2 common keywords = similar
-                    similar_tickets.append({
-                        "key": ticket.get("key"),
-                        "summary": ticket.get("summary", ""),
-                        "common_keywords": list(common_keywords),
-                        "similarity_score": len(common_keywords) / len(set(current_keywords).union(set(ticket_keywords)))
-                    })
-                
-                # Track trending patterns
-                for keyword in ticket_keywords:
-                    if keyword in current_keywords:
-                        trending_patterns[keyword] = trending_patterns.get(keyword, 0) + 1
+            overlap_counts: Dict[str, int] = {}
+            for keyword in current_keywords:
+                hits = keyword_index.get(keyword)
+                if not hits:
+                    continue
+                count = 0
+                for key in hits:
+                    if key != current_issue_key:
+                        count += 1
+                        overlap_counts[key] = overlap_counts.get(key, 0) + 1
+                if count:
+                    trending_patterns[keyword] = count
+
+            # Similar tickets = candidates with at least 2 common keywords
+            similar_tickets = []
+            for key, overlap in overlap_counts.items():
+                if overlap < 2:
+                    continue
+                ticket = tickets_by_key.get(key)
+                if not ticket:
+                    continue
+                common_keywords = current_set.intersection(ticket.get("keywords", ()))
+                similar_tickets.append({
+                    "key": key,
+                    "summary": ticket.get("summary", ""),
+                    "common_keywords": list(common_keywords),
+                    "similarity_score": len(common_keywords) / len(current_set.union(ticket.get("keywords", ())))
+                })
+            # Top-k selection instead of a full sort - O(n log k) and the
+            # result only ever surfaces the five best matches
+            similar_tickets = heapq.nlargest(5, similar_tickets,
+                                             key=lambda t: t["similarity_score"])
             
             # Determine if trends detected
             trends_detected = len(similar_tickets) >= 1 or any(count >= 2 for count in trending_patterns.values())
@@ -212,20 +590,21 @@ CREATED: {fields.get('created', '')}"""
                 "trends_detected": trends_detected,
                 "analysis_timeframe": "last 30 minutes",
                 "tickets_analyzed": len(recent_tickets),
-                "similar_tickets": similar_tickets[:5],  # Top 5 most similar
+                "similar_tickets": similar_tickets,  # Top 5 most similar
                 "trending_patterns": {k: v for k, v in trending_patterns.items() if v >= 2},
                 "current_keywords": current_keywords[:10]  # For debugging
             }
             
             if trends_detected:
-                logger.info(f"🚨 TRENDS DETECTED: {len(similar_tickets)} similar tickets, {len(result['trending_patterns'])} trending patterns")
+                logger.info("🚨 TRENDS DETECTED: %d similar tickets, %d trending patterns",
+                            len(similar_tickets), len(result["trending_patterns"]))
             else:
                 logger.info("No significant trends detected")
             
             return result
             
         except Exception as e:
-            logger.error(f"Error in trend detection: {e}")
+            logger.error("Error in trend detection: %s", e)
             return {
                 "trends_detected": False,
                 "error": str(e),
@@ -235,73 +614,51 @@ CREATED: {fields.get('created', '')}"""
     def _search_recent_tickets(self, minutes: int = 30) -> List[Dict]:
         """Search for tickets created/updated in last N minutes"""
         try:
-            # Import your JiraAPI here to avoid circular imports
-            from jira.api import JiraAPI
-            
-            # Use your existing JiraAPI class
-            jira = JiraAPI(self.config)
-            
+            cached_at, cached_minutes, cached_tickets = self._recent_cache
+            if cached_minutes == minutes and time.monotonic() - cached_at < 30:
+                return cached_tickets
+
+            jira = self._jira
+
             # Build JQL for recent tickets
             jql = f"created >= '-{minutes}m' OR updated >= '-{minutes}m' ORDER BY created DESC"
             
-            logger.info(f"Searching for tickets in last {minutes} minutes: {jql}")
+            logger.info("Searching for tickets in last %d minutes: %s", minutes, jql)
             
-            # Search tickets using your existing search method
-            search_result = jira.search_issues(jql, max_results=50)
+            # Search tickets using your existing search method, pulling only
+            # the fields trend analysis reads to keep the payload small
+            search_result = jira.search_issues(
+                jql, max_results=50,
+                fields=["summary", "description", "issuetype", "priority", "created"],
+            )
             
             if "error" in search_result:
-                logger.error(f"JQL search failed: {search_result['error']}")
+                logger.error("JQL search failed: %s", search_result["error"])
                 return []
             
             tickets = []
             for issue in search_result.get("issues", []):
                 fields = issue.get("fields", {})
                 
-                # Extract description
-                description = ""
-                desc_obj = fields.get("description")
-                if desc_obj and isinstance(desc_obj, dict) and "content" in desc_obj:
-                    for block in desc_obj.get("content", []):
-                        if block.get("type") == "paragraph":
-                            for content in block.get("content", []):
-                                if content.get("type") == "text":
-                                    description += content.get("text", "")
+                description = extract_text(fields.get("description"))
                 
                 tickets.append({
                     "key": issue.get("key"),
                     "summary": fields.get("summary", ""),
                     "description": description,
-                    "issue_type": fields.get("issuetype", {}).get("name", ""),
-                    "priority": fields.get("priority", {}).get("name", ""),
+                    "issue_type": _safe(fields, "issuetype", "name"),
+                    "priority": _safe(fields, "priority", "name"),
                     "created": fields.get("created", "")
                 })
             
-            logger.info(f"Found {len(tickets)} recent tickets for trend analysis")
+            logger.info("Found %d recent tickets for trend analysis", len(tickets))
+            self._recent_cache = (time.monotonic(), minutes, tickets)
             return tickets
             
         except Exception as e:
-            logger.error(f"Error searching recent tickets: {e}")
+            logger.error("Error searching recent tickets: %s", e)
             return []
 
-    def _extract_keywords_from_context(self, context: str) -> List[str]:
-        """Extract meaningful keywords from issue context"""
-        # Get summary and description lines
-        lines = context.split('\n')
-        summary_line = next((line for line in lines if line.startswith('SUMMARY:')), '')
-        description_start = next((i for i, line in enumerate(lines) if line.startswith('DESCRIPTION:')), -1)
-        
-        summary_text = summary_line.replace('SUMMARY:', '').strip()
-        
-        description_text = ""
-        if description_start >= 0:
-            for line in lines[description_start+1:]:
-                if line.startswith('STATUS:') or line.startswith('CREATED:'):
-                    break
-                description_text += line + " "
-        
-        combined_text = f"{summary_text} {description_text}".strip()
-        return self._extract_keywords_from_text(combined_text)
-
     def _extract_keywords_from_text(self, text: str) -> List[str]:
         """Extract meaningful keywords from text"""
         if not text:
@@ -309,91 +666,140 @@ CREATED: {fields.get('created', '')}"""
         
         # Convert to lowercase and clean
         text = text.lower()
-        
-        # Remove common stop words
-        stop_words = {
-            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by',
-            'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did',
-            'will', 'would', 'could', 'should', 'can', 'may', 'might', 'this', 'that', 'these', 'those',
-            'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her', 'us', 'them', 'my', 'your',
-            'his', 'our', 'their', 'please', 'need', 'needs', 'unable', 'issue', 'problem', 'help'
-        }
-        
+
         # Extract words (alphanumeric, 3+ chars)
-        words = re.findall(r'\b[a-zA-Z0-9]{3,}\b', text)
-        
+        words = _WORD_RE.findall(text)
+
         # Filter meaningful keywords
         keywords = []
         for word in words:
-            if (word not in stop_words and 
-                not word.isdigit() and 
-                len(word) >= 3):
+            if word not in _STOP_WORDS and not word.isdigit():
                 keywords.append(word)
         
-        # Return unique keywords, preserving order
-        seen = set()
-        unique_keywords = []
-        for keyword in keywords:
-            if keyword not in seen:
-                seen.add(keyword)
-                unique_keywords.append(keyword)
-        
-        return unique_keywords[:20]  # Limit to top 20 keywords
+        # Unique keywords, order preserved - dict.fromkeys dedupes at C level
+        return list(dict.fromkeys(keywords))[:20]  # Limit to top 20 keywords
 
     def _analyze_with_ai(self, issue_context: str, trend_analysis: Dict) -> Dict:
         """Analyze ticket with AI including trend context"""
         try:
-            # Build enhanced prompt with trend info
-            prompt = f"""Analyze this support ticket for L1 triage:
+            # Keyed on the issue context alone (trend info varies per run)
+            cached = _TRIAGE_CACHE.get(self.system_prompt, issue_context)
+            if cached is not None:
+                logger.info("Semantic triage cache hit - skipping AI call")
+                return cached
 
-{issue_context}
+            # Only interpolate the trend section when trends actually exist -
+            # the dominant no-trend path skips four dict lookups plus the
+            # formatting, and keeps the prompt shape stable across tickets
+            if trend_analysis.get("trends_detected"):
+                trend_section = f"""
 
 TREND ANALYSIS:
-- Trends detected: {trend_analysis.get('trends_detected', False)}
+- Trends detected: True
 - Similar tickets in last 30 min: {len(trend_analysis.get('similar_tickets', []))}
 - Trending patterns: {list(trend_analysis.get('trending_patterns', {}).keys())[:3]}
 
-If trends are detected, consider this may be part of a larger incident requiring higher priority/escalation.
+This may be part of a larger incident requiring higher priority/escalation."""
+            else:
+                trend_section = ""
+
+            prompt = f"""Analyze this support ticket for L1 triage:
+
+{issue_context}{trend_section}
 
 Respond with JSON only:"""
 
-            logger.info(f"Calling AI model: {self.model}")
+            logger.info("Calling AI model: %s", self.model)
             
-            response = requests.post(self.ollama_url, json={
+            # Stream tokens so we can stop reading (and cancel generation)
+            # as soon as the JSON object closes, instead of waiting out the
+            # full num_predict budget on short answers
+            payload = orjson.dumps({
                 "model": self.model,
-                "prompt": f"{self.system_prompt}\n\n{prompt}",
-                "stream": False,
+                "system": self.system_prompt,
+                "prompt": prompt,
+                "stream": True,
+                "keep_alive": "30m",
                 "options": {
                     "temperature": 0.1,
                     "top_p": 0.9,
                     "num_predict": 800,
-                    "num_ctx": 4096
+                    # Server-side backstop for the client-side brace stop:
+                    # fences or blank-line rambling after the JSON end
+                    # generation inside Ollama instead of burning tokens
+                    "stop": ["```", "\n\n\n"],
+                    "num_ctx": _fit_num_ctx(len(self.system_prompt) + len(prompt), 800)
                 }
-            }, timeout=120)
-            
+            })
+            response = _OLLAMA_SESSION.post(
+                self.ollama_url, data=payload,
+                headers={"Content-Type": "application/json"},
+                timeout=120, stream=True,
+            )
+
             response.raise_for_status()
-            result = response.json()
-            ai_text = result.get("response", "").strip()
-            
-            logger.info(f"Raw AI response length: {len(ai_text)} chars")
-            
-            # Extract JSON from response
-            json_match = re.search(r'\{.*\}', ai_text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-                logger.info(f"Extracted JSON string: {json_str[:100]}...")
-                
+
+            parsed = None
+            buf = ""
+            pending = []
+            brace_at = -1  # position of the opening brace, once seen
+            tokens_since_check = 0
+            try:
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = orjson.loads(line)
+                    pending.append(chunk.get("response", ""))
+                    if chunk.get("done"):
+                        break
+                    # Probe for a complete object every 64 tokens - raw_decode
+                    # over a partial buffer is cheap relative to inference.
+                    # Only new text is joined/scanned each probe, so models
+                    # that emit long preambles before the JSON don't pay a
+                    # full re-scan of the prefix every time.
+                    tokens_since_check += 1
+                    if tokens_since_check >= 64:
+                        tokens_since_check = 0
+                        scanned = len(buf)
+                        buf += "".join(pending)
+                        pending.clear()
+                        if brace_at < 0:
+                            brace_at = buf.find('{', scanned)
+                        if brace_at >= 0:
+                            try:
+                                parsed, _ = _JSON_DECODER.raw_decode(buf, brace_at)
+                                break
+                            except json.JSONDecodeError:
+                                pass
+            finally:
+                # Dropping the connection early cancels the server-side
+                # generation on current Ollama builds
+                response.close()
+
+            if parsed is None:
+                scanned = len(buf)
+                buf += "".join(pending)
+                pending.clear()
+                logger.info("Raw AI response length: %d chars", len(buf))
+
+                # Extract JSON from response, continuing from where the
+                # streaming probes left off
+                if brace_at < 0:
+                    brace_at = buf.find('{', scanned)
+                if brace_at < 0:
+                    logger.error("No JSON found in AI response")
+                    return self._get_fallback_triage()
                 try:
-                    return json.loads(json_str)
+                    parsed, _ = _JSON_DECODER.raw_decode(buf, brace_at)
                 except json.JSONDecodeError as e:
-                    logger.error(f"JSON decode error: {e}")
+                    logger.error("JSON decode error: %s", e)
                     return self._get_fallback_triage()
-            else:
-                logger.error("No JSON found in AI response")
-                return self._get_fallback_triage()
+
+            _TRIAGE_CACHE.put(self.system_prompt, issue_context, parsed)
+            return parsed
                 
         except Exception as e:
-            logger.error(f"AI analysis failed: {e}")
+            logger.error("AI analysis failed: %s", e)
             return {"error": str(e)}
 
     def _get_fallback_triage(self) -> Dict:
@@ -412,218 +818,87 @@ Respond with JSON only:"""
     def _post_triage_comment(self, issue_key: str, triage_result: Dict, trend_analysis: Dict) -> bool:
         """Post comprehensive triage comment to Jira ticket using ADF format"""
         try:
-            from jira.api import JiraAPI
-            
-            jira = JiraAPI(self.config)
-            
-            # Build formatted triage comment using ADF
+            jira = self._jira
+
+            # Bind everything read from the result dicts once
             triage_level = triage_result.get('triage_level', 'unknown')
+            summary = triage_result.get('summary', 'Analysis complete')
+            effort = triage_result.get('estimated_effort', 'unknown')
+            priority = triage_result.get('priority_suggestion', 'medium')
+            incident_risk = triage_result.get('incident_risk', 'low')
+            next_steps = triage_result.get('next_steps')
+            missing_info = triage_result.get('missing_info')
+            escalation_reason = triage_result.get('escalation_reason')
+            confidence_pct = int(triage_result.get('confidence', 0) * 100)
+            trends_detected = trend_analysis.get("trends_detected")
+
             triage_emoji = "🟢" if triage_level == 'l1_doable' else "🟡" if triage_level == 'needs_info' else "🔴"
-            
-            # Add trend alert emoji if trends detected
-            if trend_analysis.get("trends_detected"):
+            if trends_detected:
                 triage_emoji += "🚨"
-            
+
             # Build ADF document structure
-            content_blocks = []
-            
-            # Header
-            content_blocks.append({
-                "type": "paragraph",
-                "content": [
-                    {"type": "text", "text": "🤖 ", "marks": []},
-                    {"type": "text", "text": "L1 Triage Bot", "marks": [{"type": "strong"}]},
-                    {"type": "text", "text": f" {triage_emoji}", "marks": []}
-                ]
-            })
-            
-            # Assessment
-            content_blocks.append({
-                "type": "paragraph",
-                "content": [
-                    {"type": "text", "text": "Assessment: ", "marks": [{"type": "strong"}]},
-                    {"type": "text", "text": triage_result.get('summary', 'Analysis complete'), "marks": []}
-                ]
-            })
-            
-            # Triage Level
-            content_blocks.append({
-                "type": "paragraph",
-                "content": [
-                    {"type": "text", "text": "Triage Level: ", "marks": [{"type": "strong"}]},
-                    {"type": "text", "text": triage_level.replace('_', ' ').title(), "marks": []}
-                ]
-            })
-            
-            # Estimated Effort
-            content_blocks.append({
-                "type": "paragraph",
-                "content": [
-                    {"type": "text", "text": "Estimated Effort: ", "marks": [{"type": "strong"}]},
-                    {"type": "text", "text": triage_result.get('estimated_effort', 'unknown'), "marks": []}
-                ]
-            })
-            
-            # Suggested Priority
-            content_blocks.append({
-                "type": "paragraph",
-                "content": [
-                    {"type": "text", "text": "Suggested Priority: ", "marks": [{"type": "strong"}]},
-                    {"type": "text", "text": triage_result.get('priority_suggestion', 'medium').title(), "marks": []}
-                ]
-            })
-            
+            content_blocks = [
+                # Header
+                _para(_text("🤖 "), _text("L1 Triage Bot", "strong"), _text(f" {triage_emoji}")),
+                _para(_text("Assessment: ", "strong"), _text(summary)),
+                _para(_text("Triage Level: ", "strong"), _text(triage_level.replace('_', ' ').title())),
+                _para(_text("Estimated Effort: ", "strong"), _text(effort)),
+                _para(_text("Suggested Priority: ", "strong"), _text(priority.title())),
+            ]
+
             # Add incident risk if elevated
-            if triage_result.get('incident_risk', 'low') != 'low':
-                content_blocks.append({
-                    "type": "paragraph",
-                    "content": [
-                        {"type": "text", "text": "Incident Risk: ", "marks": [{"type": "strong"}]},
-                        {"type": "text", "text": triage_result.get('incident_risk', 'unknown').title(), "marks": []}
-                    ]
-                })
-            
+            if incident_risk != 'low':
+                content_blocks.append(_para(_text("Incident Risk: ", "strong"), _text(incident_risk.title())))
+
             # TREND ANALYSIS SECTION
-            if trend_analysis.get("trends_detected"):
-                content_blocks.append({
-                    "type": "paragraph",
-                    "content": [
-                        {"type": "text", "text": "🚨 ", "marks": []},
-                        {"type": "text", "text": "TREND ALERT", "marks": [{"type": "strong"}]},
-                        {"type": "text", "text": " - Similar Pattern Detected!", "marks": []}
-                    ]
-                })
-                
-                similar_count = len(trend_analysis.get("similar_tickets", []))
-                content_blocks.append({
-                    "type": "paragraph",
-                    "content": [
-                        {"type": "text", "text": f"Found ", "marks": []},
-                        {"type": "text", "text": f"{similar_count} similar tickets", "marks": [{"type": "strong"}]},
-                        {"type": "text", "text": " in the last 30 minutes:", "marks": []}
-                    ]
-                })
-                
-                # Add similar tickets as bullet list
-                if trend_analysis.get("similar_tickets"):
-                    bullet_items = []
-                    for ticket in trend_analysis.get("similar_tickets", [])[:3]:
-                        bullet_items.append({
-                            "type": "listItem",
-                            "content": [
-                                {
-                                    "type": "paragraph",
-                                    "content": [
-                                        {"type": "text", "text": f"{ticket['key']}: {ticket['summary'][:60]}...", "marks": []}
-                                    ]
-                                }
-                            ]
-                        })
-                    
+            if trends_detected:
+                similar = trend_analysis.get("similar_tickets", [])
+                content_blocks.append(_para(
+                    _text("🚨 "), _text("TREND ALERT", "strong"), _text(" - Similar Pattern Detected!")))
+                content_blocks.append(_para(
+                    _text("Found "), _text(f"{len(similar)} similar tickets", "strong"),
+                    _text(" in the last 30 minutes:")))
+
+                if similar:
                     content_blocks.append({
                         "type": "bulletList",
-                        "content": bullet_items
+                        "content": [_list_item(f"{t['key']}: {t['summary'][:60]}...") for t in similar[:3]]
                     })
-                
-                # Trending patterns
-                if trend_analysis.get("trending_patterns"):
-                    top_patterns = sorted(trend_analysis["trending_patterns"].items(), 
-                                        key=lambda x: x[1], reverse=True)[:3]
-                    pattern_text = ', '.join([f'{pattern} ({count}x)' for pattern, count in top_patterns])
-                    
-                    content_blocks.append({
-                        "type": "paragraph",
-                        "content": [
-                            {"type": "text", "text": "Trending Keywords: ", "marks": [{"type": "strong"}]},
-                            {"type": "text", "text": pattern_text, "marks": []}
-                        ]
-                    })
-                
-                # Escalation warning
-                content_blocks.append({
-                    "type": "paragraph",
-                    "content": [
-                        {"type": "text", "text": "⚠️ ", "marks": []},
-                        {"type": "text", "text": "This may indicate a system-wide issue requiring immediate escalation!", "marks": [{"type": "strong"}]}
-                    ]
-                })
-            
+
+                trending = trend_analysis.get("trending_patterns")
+                if trending:
+                    top_patterns = heapq.nlargest(3, trending.items(), key=lambda x: x[1])
+                    pattern_text = ', '.join(f'{pattern} ({count}x)' for pattern, count in top_patterns)
+                    content_blocks.append(_para(_text("Trending Keywords: ", "strong"), _text(pattern_text)))
+
+                content_blocks.append(_para(
+                    _text("⚠️ "),
+                    _text("This may indicate a system-wide issue requiring immediate escalation!", "strong")))
+
             # Action steps
-            if triage_result.get('next_steps'):
-                content_blocks.append({
-                    "type": "paragraph",
-                    "content": [
-                        {"type": "text", "text": "Recommended Next Steps:", "marks": [{"type": "strong"}]}
-                    ]
-                })
-                
-                step_items = []
-                for i, step in enumerate(triage_result['next_steps'], 1):
-                    step_items.append({
-                        "type": "listItem",
-                        "content": [
-                            {
-                                "type": "paragraph",
-                                "content": [
-                                    {"type": "text", "text": step, "marks": []}
-                                ]
-                            }
-                        ]
-                    })
-                
+            if next_steps:
+                content_blocks.append(_para(_text("Recommended Next Steps:", "strong")))
                 content_blocks.append({
                     "type": "orderedList",
-                    "content": step_items
+                    "content": [_list_item(step) for step in next_steps]
                 })
-            
+
             # Missing information
-            if triage_result.get('missing_info'):
-                content_blocks.append({
-                    "type": "paragraph",
-                    "content": [
-                        {"type": "text", "text": "Information Needed:", "marks": [{"type": "strong"}]}
-                    ]
-                })
-                
-                info_items = []
-                for info in triage_result['missing_info']:
-                    info_items.append({
-                        "type": "listItem",
-                        "content": [
-                            {
-                                "type": "paragraph",
-                                "content": [
-                                    {"type": "text", "text": info, "marks": []}
-                                ]
-                            }
-                        ]
-                    })
-                
+            if missing_info:
+                content_blocks.append(_para(_text("Information Needed:", "strong")))
                 content_blocks.append({
                     "type": "bulletList",
-                    "content": info_items
+                    "content": [_list_item(info) for info in missing_info]
                 })
-            
+
             # Escalation reason
-            if triage_result.get('escalation_reason'):
-                content_blocks.append({
-                    "type": "paragraph",
-                    "content": [
-                        {"type": "text", "text": "Escalation Note: ", "marks": [{"type": "strong"}]},
-                        {"type": "text", "text": triage_result['escalation_reason'], "marks": []}
-                    ]
-                })
-            
+            if escalation_reason:
+                content_blocks.append(_para(_text("Escalation Note: ", "strong"), _text(escalation_reason)))
+
             # Footer
-            confidence_pct = int(triage_result.get('confidence', 0) * 100)
-            footer_text = f"Confidence: {confidence_pct}% | Auto-generated at {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-            content_blocks.append({
-                "type": "paragraph",
-                "content": [
-                    {"type": "text", "text": footer_text, "marks": [{"type": "em"}]}
-                ]
-            })
-            
+            footer_text = f"Confidence: {confidence_pct}% | Auto-generated at {minute_now_cached()}"
+            content_blocks.append(_para(_text(footer_text, "em")))
+
             # Build final ADF payload
             adf_payload = {
                 "body": {
@@ -637,14 +912,15 @@ Respond with JSON only:"""
             comment_result = jira.add_comment(issue_key, adf_payload)
             
             if "error" in comment_result:
-                logger.error(f"Failed to post triage comment to {issue_key}: {comment_result['error']}")
+                logger.error("Failed to post triage comment to %s: %s", issue_key, comment_result["error"])
                 return False
             else:
-                logger.info(f"Posted L1 triage comment to {issue_key}")
+                logger.info("Posted L1 triage comment to %s", issue_key)
                 return True
                 
         except Exception as e:
-            logger.error(f"Error posting triage comment to {issue_key}: {e}")
-            import traceback
-            logger.error(f"Full traceback: {traceback.format_exc()}")
+            logger.error("Error posting triage comment to %s: %s", issue_key, e)
+            if logger.isEnabledFor(logging.ERROR):
+                import traceback
+                logger.error("Full traceback: %s", traceback.format_exc())
             return False
\ No newline at end of file
@@ -1,6 +1,33 @@
 # agents/planner.py
+import re
+
+import orjson
 from typing import Literal, List, Optional, Dict, Any
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, field_validator
+
+_JSON_TAIL_RE = re.compile(r"\{.*\}\s*$", re.S)
+
+# Heuristic keyword tables: one compiled alternation per field scans the
+# text in a single C-level pass instead of one str.__contains__ per keyword
+_SUMMARY_KEYWORDS_RE = re.compile(r"custom field|workflow|form")
+_DESC_KEYWORDS_RE = re.compile(r"create field|transition|request form|jsm")
+_KEYWORD_INTENTS = {
+    "custom field": ("create_custom_field", 0.8),
+    "create field": ("create_custom_field", 0.8),
+    "workflow": ("update_workflow", 0.75),
+    "transition": ("update_workflow", 0.75),
+    "form": ("create_jsm_form", 0.8),
+    "request form": ("create_jsm_form", 0.8),
+    "jsm": ("create_jsm_form", 0.8),
+}
+# Mirrors the old if/elif ordering: field asks beat workflow beat form
+_INTENT_PRIORITY = ("create_custom_field", "update_workflow", "create_jsm_form")
+
+_MODE_INTENTS = {
+    "mode:pm": "create_jsm_form",
+    "mode:admin": "create_custom_field",
+    "mode:gov": "governance_preflight_only",
+}
 
 Intent = Literal[
     "create_custom_field",
@@ -24,41 +51,25 @@ class Plan(BaseModel):
     steps: List[PlanStep] = Field(default_factory=list)
     notes: Optional[str] = None
 
-    @validator("confidence")
+    @field_validator("confidence")
+    @classmethod
     def _conf_range(cls, v):  # guard against bad LLM output
         return max(0.0, min(1.0, float(v)))
 
-def classify_with_rules(issue: dict) -> Optional[Plan]:
-    summary = (issue.get("fields", {}).get("summary") or "").lower()
-    desc = (issue.get("fields", {}).get("description") or "").lower()
-    labels = [l.lower() for l in (issue.get("fields", {}).get("labels") or [])]
-
-    # Hard overrides by label
-    for lb in labels:
-        if lb.startswith("mode:"):
-            mode = lb.split(":",1)[1]
-            if mode == "pm":  return Plan(intent="create_jsm_form", confidence=0.99, steps=[])
-            if mode == "admin": return Plan(intent="create_custom_field", confidence=0.99, steps=[])
-            if mode == "gov": return Plan(intent="governance_preflight_only", confidence=0.99, steps=[])
-
-    # Quick heuristics
-    if "custom field" in summary or "create field" in desc:
-        return Plan(intent="create_custom_field", confidence=0.8, steps=[])
-    if "workflow" in summary or "transition" in desc:
-        return Plan(intent="update_workflow", confidence=0.75, steps=[])
-    if "form" in summary or "request form" in desc or "jsm" in desc:
-        return Plan(intent="create_jsm_form", confidence=0.8, steps=[])
-    return None
+# Schema never changes at runtime; serialize it once instead of walking
+# the model tree on every planner call
+_PLAN_SCHEMA_JSON = orjson.dumps(
+    Plan.model_json_schema(), option=orjson.OPT_INDENT_2
+).decode()
 
-def build_llm_plan(llm, issue: dict) -> Plan:
-    """
-    Ask your big model to produce a JSON Plan (Plan schema).
-    Return Plan; on parse error, return Plan(intent="other", confidence=0, steps=[]).
-    """
-    prompt = f"""You are the Planner. Read this Jira issue and output ONE JSON object matching schema:
-{Plan.schema_json(indent=2)}
-Issue (compact): {{"summary": "{issue.get('fields',{}).get('summary','')}", "description": "...", "labels": {issue.get('fields',{}).get('labels',[])}}}
-Rules:
+# Single template with the schema baked in at import; each call does one
+# format pass over a prebuilt buffer instead of re-joining prompt pieces.
+# The schema's own braces are escaped so .format leaves them intact.
+_PLAN_PROMPT_TMPL = (
+    "You are the Planner. Read this Jira issue and output ONE JSON object matching schema:\n"
+    + _PLAN_SCHEMA_JSON.replace("{", "{{").replace("}", "}}") + "\n"
+    + 'Issue (compact): {{"summary": "{summary}", "description": "...", "labels": {labels}}}\n'
+    + """Rules:
 - Choose the most likely intent.
 - Confidence 0..1.
 - If mutating Screens/Workflows/Field Configs, set require_governance=true and include a first step 'governance_bot' with action 'preflight'.
@@ -67,12 +78,51 @@ Rules:
    {{"agent":"governance_bot","action":"screen_preflight","params":{{"screen_id":"..."}}}},
    {{"agent":"admin_validator","action":"provision_field_to_screen","params":{{"field_id":"...","screen_id":"...","tab_id":"Main"}}}}]
 Only output JSON."""
+)
+
+def classify_with_rules(issue: dict) -> Optional[Plan]:
+    fields = issue.get("fields", {})
+
+    # Hard overrides by label, checked before summary/description are even
+    # lowercased — descriptions can be multi-KB and a mode:* label is a
+    # deterministic answer that makes scanning them pointless
+    # Jira labels are almost always lowercase already; islower() is an
+    # allocation-free scan, so .lower() only runs on the odd mixed-case label
+    for lb in (fields.get("labels") or ()):
+        intent = _MODE_INTENTS.get(lb if lb.islower() else lb.lower())
+        if intent:
+            return Plan(intent=intent, confidence=0.99, steps=[])
+
+    summary = (fields.get("summary") or "").lower()
+    desc = (fields.get("description") or "").lower()
+
+    # Quick heuristics: collect every keyword hit in two regex passes,
+    # then resolve by the fixed priority order
+    hits = {}
+    for kw in _SUMMARY_KEYWORDS_RE.findall(summary):
+        hits.setdefault(*_KEYWORD_INTENTS[kw])
+    for kw in _DESC_KEYWORDS_RE.findall(desc):
+        hits.setdefault(*_KEYWORD_INTENTS[kw])
+    for intent in _INTENT_PRIORITY:
+        if intent in hits:
+            return Plan(intent=intent, confidence=hits[intent], steps=[])
+    return None
+
+def build_llm_plan(llm, issue: dict) -> Plan:
+    """
+    Ask your big model to produce a JSON Plan (Plan schema).
+    Return Plan; on parse error, return Plan(intent="other", confidence=0, steps=[]).
+    """
+    fields = issue.get('fields', {})
+    prompt = _PLAN_PROMPT_TMPL.format(
+        summary=fields.get('summary', ''),
+        labels=fields.get('labels', []),
+    )
     text = llm.generate(prompt)  # your existing LLM call
     plan = None
     try:
-        import json, re
-        match = re.search(r"\{.*\}\s*$", text, flags=re.S)
-        plan = Plan.parse_obj(json.loads(match.group(0)) if match else {})
+        match = _JSON_TAIL_RE.search(text)
+        plan = Plan.model_validate(orjson.loads(match.group(0)) if match else {})
     except Exception:
         plan = Plan(intent="other", confidence=0.0, steps=[], notes="Planner parse error")
     return plan
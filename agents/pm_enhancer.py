@@ -3,35 +3,68 @@ PM Enhancer Agent - Transforms messy tickets into professional user stories
 """
 
 from typing import Dict, Any, List, Optional
-import json
+import asyncio
+import copy
+import hashlib
 import re
 import logging
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
 
 from config import Config
 from jira.api import JiraAPI
 from ai.ollama_client import call_ollama
 from utils.logger import get_logger
+from utils.timefmt import iso_now_cached
 
 logger = get_logger(__name__)
-log = logging.getLogger(__name__)
 
 # -------------------- Robust parsing helpers --------------------
 
-EXPECTED_KEYS = {
+EXPECTED_KEYS: frozenset = frozenset({
     "new_summary", "new_description", "acceptance_criteria",
     "estimate", "labels", "subtasks", "comment", "marker"
-}
+})
+
+# Compiled once; every LLM response goes through this
+_JSON_TAIL_RE = re.compile(r"\{.*\}\s*$", re.S)
+
+# Case-insensitive scan without lowercasing the whole description
+_AC_RE = re.compile(r"acceptance criteria", re.IGNORECASE)
+
+# Shared by reference in every ADF description build
+_STRONG_MARKS = [{"type": "strong"}]
+
+# Shared fallback for absent/null nested fields — never mutated, never
+# reallocated per lookup
+_EMPTY: Dict = {}
+
+# (issue, suggestion) per health check, indexed by bit position
+_HEALTH_CHECKS = (
+    ("No assignee", "Assign to appropriate team member"),
+    ("Missing or minimal description", "Add detailed requirements and context"),
+    ("No components assigned", "Tag with relevant component"),
+    ("No labels", "Add categorization labels"),
+    ("No acceptance criteria", "Define clear acceptance criteria"),
+    ("No priority set", "Set appropriate priority level"),
+)
+
+_PARSE_FAIL_COMMENT = (
+    "<!--pm-ai-->\n\n**🤖 PM Enhancer Needs Info**\n\n"
+    "I couldn't parse a valid JSON enhancement from the model output. "
+    "Please re-run or provide more details (e.g., acceptance criteria, labels, components)."
+)
 
 def _extract_json_block(text: str) -> Optional[Dict[str, Any]]:
     """Return a dict parsed from the last {...} block in text; else None."""
     if not text or not isinstance(text, str):
         return None
-    m = re.search(r"\{.*\}\s*$", text, flags=re.S)
+    m = _JSON_TAIL_RE.search(text)
     if not m:
         return None
     try:
-        return json.loads(m.group(0))
+        return orjson.loads(m.group(0))
     except Exception:
         return None
 
@@ -43,9 +76,10 @@ def _normalize_ai_result(ai_result: Any) -> Optional[Dict[str, Any]]:
       - dict with 'response'/'text' containing JSON
       - raw string with JSON or prose + JSON
     """
-    # already a dict with expected keys
+    # already a dict with expected keys; probe the near-universal key first,
+    # then one C-level isdisjoint pass instead of a per-key generator
     if isinstance(ai_result, dict):
-        if any(k in ai_result for k in EXPECTED_KEYS):
+        if "new_summary" in ai_result or not EXPECTED_KEYS.isdisjoint(ai_result):
             return ai_result
         txt = ai_result.get("response") or ai_result.get("text") or ai_result.get("message")
         parsed = _extract_json_block(txt) if isinstance(txt, str) else None
@@ -65,14 +99,15 @@ def _extract_description_text(description_obj: Any) -> str:
     if isinstance(description_obj, str):
         return description_obj
     if isinstance(description_obj, dict):
-        text = []
-        content = description_obj.get("content", []) or []
-        for block in content:
-            if block.get("type") == "paragraph":
-                for item in (block.get("content") or []):
-                    if item.get("type") == "text":
-                        text.append(item.get("text", ""))
-        return "".join(text)
+        # Single pass fed straight into join — no intermediate list or
+        # per-item append on large migration descriptions
+        return "".join(
+            item.get("text", "")
+            for block in (description_obj.get("content") or ())
+            if block.get("type") == "paragraph"
+            for item in (block.get("content") or ())
+            if item.get("type") == "text"
+        )
     return str(description_obj)
 
 # -------------------- Agent --------------------
@@ -80,22 +115,16 @@ def _extract_description_text(description_obj: Any) -> str:
 class PMEnhancer:
     """AI agent that transforms meeting notes and messy ticket descriptions into professional user stories"""
 
-    def __init__(self, config: Config):
-        self.config = config
-        # ✅ Cloud Basic OR Server/DC Bearer
-        has_jira_creds = bool(
-            (config.jira_email and config.jira_api_token) or config.jira_bearer_token
-        )
-        self.jira = JiraAPI(config) if has_jira_creds else None
-
-        # System prompt for PM enhancement
-        self.system_prompt = """You transform meeting notes, brain dumps, and messy ticket descriptions into professional Jira stories.
+    # Built once and shared across instances; keeping this byte-identical
+    # between calls lets the Ollama backend reuse its prompt-prefix KV cache
+    # (only the per-issue context varies)
+    SYSTEM_PROMPT = """You transform meeting notes, brain dumps, and messy ticket descriptions into professional Jira stories.
 
 INPUT: Raw meeting transcripts, scattered notes, or unclear requirements
 OUTPUT: Clean JSON with proper ticket structure
 
 You excel at:
-- Extracting actionable requirements from rambling meeting discussions  
+- Extracting actionable requirements from rambling meeting discussions
 - Breaking complex ideas into clear, implementable user stories
 - Adding missing context that dev teams need (technical details, edge cases)
 - Creating realistic acceptance criteria from vague requirements
@@ -106,7 +135,7 @@ CRITICAL: Never invent features not mentioned. If key info is missing, note it i
 CRITICAL: Return ONLY one valid JSON object matching this structure. No prose, no Markdown, no code fences.
 {
   "new_summary": "Clear, action-oriented summary",
-  "new_description": "Professional description with context and technical details", 
+  "new_description": "Professional description with context and technical details",
   "acceptance_criteria": ["Given X when Y then Z", "Given A when B then C"],
   "estimate": 5.0,
   "labels": ["backend", "api"],
@@ -115,24 +144,53 @@ CRITICAL: Return ONLY one valid JSON object matching this structure. No prose, n
   "marker": "<!--pm-ai-->"
 }"""
 
+    def __init__(self, config: Config):
+        self.config = config
+        # ✅ Cloud Basic OR Server/DC Bearer
+        has_jira_creds = bool(
+            (config.jira_email and config.jira_api_token) or config.jira_bearer_token
+        )
+        self.jira = JiraAPI(config) if has_jira_creds else None
+
+        # Exact-match memo of summary+description -> parsed enhancement.
+        # Webhooks re-fire on the same ticket (edits, retries, reopens) and
+        # meeting-note templates repeat verbatim; identical input skips the
+        # model entirely. Jira side effects still run on every call.
+        self._enhance_cache: Dict[str, Dict] = {}
+
+        # System prompt for PM enhancement (shared class constant)
+        self.system_prompt = self.SYSTEM_PROMPT
+
+        # Small pool so the issue update and the comment post (independent
+        # Jira round-trips) can run concurrently instead of back-to-back
+        self._io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="pm-io")
+
     def process(self, issue_data: Dict) -> Dict:
         """Main processing method for PM enhancement requests"""
         issue_key = issue_data.get("key", "UNKNOWN")
-        fields = issue_data.get("fields") or {}
+        fields = issue_data.get("fields") or _EMPTY
 
-        logger.info(f"✨ Processing PM enhancement for issue: {issue_key}")
+        logger.info("✨ Processing PM enhancement for issue: %s", issue_key)
 
         # Extract basic info
         summary = fields.get("summary") or ""
         description = _extract_description_text(fields.get("description"))
 
-        logger.info(f"📝 Original summary: {summary}")
-        logger.info(f"📄 Description length: {len(description)} characters")
+        logger.info("📝 Original summary: %s", summary)
+        logger.info("📄 Description length: %d characters", len(description))
 
         try:
             # Analyze ticket health first
             health_info = self._analyze_ticket_health(fields)
-            logger.info(f"📊 Ticket health score: {health_info['health_score']}/10")
+            logger.info("📊 Ticket health score: %s/10", health_info['health_score'])
+
+            cache_key = hashlib.blake2b(
+                (summary + "\0" + description).encode(), digest_size=16
+            ).hexdigest()
+            cached = self._enhance_cache.get(cache_key)
+            if cached is not None:
+                logger.info("⚡ Enhancement cache hit - skipping AI call")
+                return self._apply_and_report(issue_key, health_info, copy.deepcopy(cached))
 
             # Build enhancement context
             enhancement_context = self._build_enhancement_context(
@@ -147,7 +205,7 @@ CRITICAL: Return ONLY one valid JSON object matching this structure. No prose, n
                 return self._create_error_response(issue_key, "Model returned no output")
 
             if isinstance(raw_ai, Dict) and "error" in raw_ai:
-                logger.error(f"❌ AI enhancement failed: {raw_ai['error']}")
+                logger.error("❌ AI enhancement failed: %s", raw_ai['error'])
                 return self._create_error_response(issue_key, raw_ai["error"])
 
             ai_result = _normalize_ai_result(raw_ai)
@@ -156,109 +214,170 @@ CRITICAL: Return ONLY one valid JSON object matching this structure. No prose, n
                 logger.error("❌ AI enhancement parse failed: could not extract JSON spec")
                 if self.jira:
                     try:
-                        self.jira.add_comment(
-                            issue_key,
-                            "<!--pm-ai-->\n\n**🤖 PM Enhancer Needs Info**\n\n"
-                            "I couldn't parse a valid JSON enhancement from the model output. "
-                            "Please re-run or provide more details (e.g., acceptance criteria, labels, components)."
-                        )
+                        self.jira.add_comment(issue_key, _PARSE_FAIL_COMMENT)
                     except Exception:
                         pass
                 return self._create_error_response(issue_key, "AI output not parseable as JSON")
 
-            logger.info("✅ AI enhancement complete!")
-            logger.info(f"📋 New summary: {(ai_result.get('new_summary') or 'N/A')[:50]}...")
-
-            # Apply enhancements to Jira if configured
-            update_applied = False
-            if self.jira and ai_result.get("new_summary"):
-                update_result = self._apply_enhancements(issue_key, ai_result)
-                update_applied = bool(update_result.get("success"))
-                if update_applied:
-                    logger.info("✅ Successfully applied enhancements to Jira!")
-                else:
-                    logger.error(f"❌ Failed to apply enhancements: {update_result.get('error')}")
-
-            # Post enhancement comment
-            comment_posted = False
-            if self.jira and ai_result.get("comment"):
-                comment_text = self._build_enhancement_comment(ai_result, health_info)
-                comment_result = self.jira.add_comment(issue_key, comment_text)
-                if "error" not in comment_result:
-                    logger.info("✅ Successfully posted enhancement comment!")
-                    comment_posted = True
-                else:
-                    logger.error(f"❌ Failed to post comment: {comment_result['error']}")
-
-            # Return comprehensive result
-            return {
-                "received": True,
-                "action": "pm_enhancement",
-                "issueKey": issue_key,
-                "mode_detected": "pm_enhancer",
-                "health_score": health_info["health_score"],
-                "enhancements_applied": update_applied,
-                "comment_posted": comment_posted,
-                "improvements": self._summarize_improvements(ai_result),
-                "ai_response": ai_result,
-                "timestamp": datetime.now().isoformat()
-            }
+            # Only genuine model output gets cached (never fallbacks)
+            if "fallback_reason" not in ai_result:
+                if len(self._enhance_cache) >= 4096:
+                    self._enhance_cache.clear()
+                self._enhance_cache[cache_key] = copy.deepcopy(ai_result)
+
+            return self._apply_and_report(issue_key, health_info, ai_result)
 
         except Exception as e:
-            logger.error(f"❌ Error processing PM enhancement: {e}")
+            logger.error("❌ Error processing PM enhancement: %s", e)
             return self._create_error_response(issue_key, str(e))
 
+    async def process_async(self, issue_data: Dict) -> Dict:
+        """Async facade over process() for event-loop callers"""
+        return await asyncio.to_thread(self.process, issue_data)
+
+    def process_batch(self, issues: List[Dict]) -> List[Dict]:
+        """Enhance several tickets with one Ollama call (bulk edits, migrations).
+
+        Packs every enhancement context into a single prompt so the model
+        prefill and system-prompt prefix are paid once for the whole burst.
+        Falls back to per-ticket process() if the batched output doesn't
+        parse into one result per ticket.
+        """
+        if len(issues) <= 1:
+            return [self.process(issue) for issue in issues]
+
+        logger.info("✨ Processing PM enhancement batch of %d issues", len(issues))
+        try:
+            keys = []
+            healths = []
+            blocks = []
+            for i, issue_data in enumerate(issues, 1):
+                issue_key = issue_data.get("key", "UNKNOWN")
+                fields = issue_data.get("fields") or _EMPTY
+                summary = fields.get("summary") or ""
+                description = _extract_description_text(fields.get("description"))
+                health_info = self._analyze_ticket_health(fields)
+                context = self._build_enhancement_context(
+                    summary, description, health_info, fields
+                )
+                keys.append(issue_key)
+                healths.append(health_info)
+                blocks.append(f"### TICKET {i} ###\n{context}")
+
+            batch_prompt = (
+                "\n".join(blocks)
+                + f"\n\nEnhance each of the {len(issues)} tickets above independently. "
+                  "Return ONE JSON object of the form "
+                  '{"results": [<enhancement object for TICKET 1>, <for TICKET 2>, ...]} '
+                  "with exactly one enhancement object per ticket, in order."
+            )
+            raw_ai = call_ollama(batch_prompt, self.system_prompt, self.config)
+
+            results = raw_ai.get("results") if isinstance(raw_ai, dict) else None
+            if (not isinstance(results, list) or len(results) != len(issues)
+                    or not all(isinstance(r, dict) for r in results)):
+                logger.warning("⚠️ Batched enhancement didn't parse; falling back to per-ticket calls")
+                return [self.process(issue) for issue in issues]
+
+            return [
+                self._apply_and_report(key, health, ai_result)
+                for key, health, ai_result in zip(keys, healths, results)
+            ]
+
+        except Exception as e:
+            logger.error("❌ Batch enhancement failed, falling back per-ticket: %s", e)
+            return [self.process(issue) for issue in issues]
+
+    def _apply_and_report(self, issue_key: str, health_info: Dict, ai_result: Dict) -> Dict:
+        """Apply a parsed enhancement to Jira and build the result payload"""
+        logger.info("✅ AI enhancement complete!")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("📋 New summary: %s...", (ai_result.get('new_summary') or 'N/A')[:50])
+
+        # The issue update and the comment post are independent Jira
+        # round-trips; submit both, then wait — total latency is the slower
+        # of the two instead of their sum
+        update_future = None
+        if self.jira and ai_result.get("new_summary"):
+            update_future = self._io_pool.submit(self._apply_enhancements, issue_key, ai_result)
+
+        comment_future = None
+        if self.jira and ai_result.get("comment"):
+            comment_text = self._build_enhancement_comment(ai_result, health_info)
+            comment_future = self._io_pool.submit(self.jira.add_comment, issue_key, comment_text)
+
+        update_applied = False
+        if update_future is not None:
+            update_result = update_future.result()
+            update_applied = bool(update_result.get("success"))
+            if update_applied:
+                logger.info("✅ Successfully applied enhancements to Jira!")
+            else:
+                logger.error("❌ Failed to apply enhancements: %s", update_result.get('error'))
+
+        comment_posted = False
+        if comment_future is not None:
+            comment_result = comment_future.result()
+            if "error" not in comment_result:
+                logger.info("✅ Successfully posted enhancement comment!")
+                comment_posted = True
+            else:
+                logger.error("❌ Failed to post comment: %s", comment_result['error'])
+
+        # Return comprehensive result
+        return {
+            "received": True,
+            "action": "pm_enhancement",
+            "issueKey": issue_key,
+            "mode_detected": "pm_enhancer",
+            "health_score": health_info["health_score"],
+            "enhancements_applied": update_applied,
+            "comment_posted": comment_posted,
+            "improvements": self._summarize_improvements(ai_result),
+            "ai_response": ai_result,
+            "timestamp": iso_now_cached()
+        }
+
     # -------------------- internals (unchanged logic) --------------------
 
     def _analyze_ticket_health(self, fields: Dict) -> Dict:
         """Analyze ticket health and identify issues"""
-        health_issues = []
-        suggestions = []
+        description = _extract_description_text(fields.get("description"))
+        priority = (fields.get("priority") or _EMPTY).get("name", "").lower()
 
-        # Check assignee
+        # One bit per failed check; the shared _HEALTH_CHECKS table maps
+        # set bits to issue/suggestion strings, so the two lists are built
+        # in a single pass instead of paired appends per check
+        missing = 0
         if not fields.get("assignee"):
-            health_issues.append("No assignee")
-            suggestions.append("Assign to appropriate team member")
-
-        # Check description quality
-        description = _extract_description_text(fields.get("description"))
+            missing |= 1
         if not description or len(description) < 50:
-            health_issues.append("Missing or minimal description")
-            suggestions.append("Add detailed requirements and context")
-
-        # Check components
+            missing |= 2
         if not fields.get("components"):
-            health_issues.append("No components assigned")
-            suggestions.append("Tag with relevant component")
-
-        # Check labels
+            missing |= 4
         if not fields.get("labels"):
-            health_issues.append("No labels")
-            suggestions.append("Add categorization labels")
-
-        # Check for acceptance criteria
-        if description and "acceptance criteria" not in description.lower():
-            health_issues.append("No acceptance criteria")
-            suggestions.append("Define clear acceptance criteria")
-
-        # Check priority
-        priority = (fields.get("priority") or {}).get("name", "").lower()
+            missing |= 8
+        # Regex scans the original string in C (no lowercase copy of what can
+        # be a 100KB migration description); the phrase, when authors include
+        # it, sits in the early part of the ticket
+        if description and not _AC_RE.search(description, 0, 4096):
+            missing |= 16
         if not priority or priority == "none":
-            health_issues.append("No priority set")
-            suggestions.append("Set appropriate priority level")
+            missing |= 32
 
+        flagged = [check for i, check in enumerate(_HEALTH_CHECKS) if missing >> i & 1]
         return {
-            "issues": health_issues,
-            "suggestions": suggestions,
-            "health_score": max(0, 10 - len(health_issues) * 1.5)
+            "issues": [issue for issue, _ in flagged],
+            "suggestions": [suggestion for _, suggestion in flagged],
+            "health_score": max(0, 10 - missing.bit_count() * 1.5)
         }
 
     def _build_enhancement_context(self, summary: str, description: str,
                                    health_info: Dict, fields: Dict) -> str:
         """Build context for AI enhancement"""
-        issue_type = (fields.get("issuetype") or {}).get("name", "Task")
-        project_key = (fields.get("project") or {}).get("key", "UNKNOWN")
-        assignee = (fields.get("assignee") or {}).get("displayName", "Unassigned")
+        issue_type = (fields.get("issuetype") or _EMPTY).get("name", "Task")
+        project_key = (fields.get("project") or _EMPTY).get("key", "UNKNOWN")
+        assignee = (fields.get("assignee") or _EMPTY).get("displayName", "Unassigned")
 
         context = f"""TICKET ENHANCEMENT REQUEST:
 Project: {project_key}
@@ -296,33 +415,34 @@ Focus on clarity, actionability, and completeness. If critical information is mi
             if ai_result.get("new_summary"):
                 update_fields["summary"] = ai_result["new_summary"]
 
-            # Update description
+            # Update description (content list built once, assigned once)
             if ai_result.get("new_description"):
-                update_fields["description"] = {
-                    "type": "doc",
-                    "version": 1,
-                    "content": [
-                        {
-                            "type": "paragraph",
-                            "content": [{"type": "text", "text": ai_result["new_description"]}]
-                        }
-                    ]
-                }
+                content = [{
+                    "type": "paragraph",
+                    "content": [{"type": "text", "text": ai_result["new_description"]}]
+                }]
                 # Acceptance criteria
                 if ai_result.get("acceptance_criteria"):
-                    update_fields["description"]["content"].append({
+                    content.append({
                         "type": "paragraph",
                         "content": [{
                             "type": "text",
                             "text": "\n\nAcceptance Criteria:",
-                            "marks": [{"type": "strong"}]
+                            "marks": _STRONG_MARKS
                         }]
                     })
-                    for criterion in ai_result["acceptance_criteria"]:
-                        update_fields["description"]["content"].append({
+                    content.extend(
+                        {
                             "type": "paragraph",
                             "content": [{"type": "text", "text": f"• {criterion}"}]
-                        })
+                        }
+                        for criterion in ai_result["acceptance_criteria"]
+                    )
+                update_fields["description"] = {
+                    "type": "doc",
+                    "version": 1,
+                    "content": content
+                }
 
             # Labels
             if ai_result.get("labels"):
@@ -333,14 +453,18 @@ Focus on clarity, actionability, and completeness. If critical information is mi
             return {"success": True, "message": "No updates to apply"}
 
         except Exception as e:
-            logger.error(f"❌ Error applying enhancements: {e}")
+            logger.error("❌ Error applying enhancements: %s", e)
             return {"error": str(e)}
 
     def _build_enhancement_comment(self, ai_result: Dict, health_info: Dict) -> str:
         """Build enhancement comment for Jira ticket"""
-        comment_text = f"{ai_result.get('marker', '<!--pm-ai-->')}\n\n"
-        comment_text += f"**🤖 AI Enhancement Applied ✨**\n\n"
-        comment_text += f"**Health Score Improvement:** {health_info['health_score']}/10\n\n"
+        # Accumulate into a list and join once — += on a growing string
+        # recopies the whole buffer on every step
+        parts = [
+            f"{ai_result.get('marker', '<!--pm-ai-->')}\n\n",
+            "**🤖 AI Enhancement Applied ✨**\n\n",
+            f"**Health Score Improvement:** {health_info['health_score']}/10\n\n",
+        ]
 
         # Improvements
         improvements = []
@@ -356,30 +480,33 @@ Focus on clarity, actionability, and completeness. If critical information is mi
             improvements.append(f"Estimated effort: {ai_result['estimate']} story points")
 
         if improvements:
-            comment_text += f"**Improvements Made:**\n"
-            for improvement in improvements:
-                comment_text += f"• {improvement}\n"
-            comment_text += "\n"
+            parts.append("**Improvements Made:**\n")
+            parts.extend(f"• {improvement}\n" for improvement in improvements)
+            parts.append("\n")
 
-        comment_text += ai_result.get('comment', 'Ticket enhanced by AI')
+        parts.append(ai_result.get('comment', 'Ticket enhanced by AI'))
 
         # Subtasks
         if ai_result.get("subtasks"):
-            comment_text += f"\n\n**Suggested Subtasks:**\n"
-            for subtask in ai_result["subtasks"]:
-                comment_text += f"• **{subtask.get('summary', 'Untitled')}**: {subtask.get('description', 'No description')}\n"
+            parts.append("\n\n**Suggested Subtasks:**\n")
+            parts.extend(
+                f"• **{subtask.get('summary', 'Untitled')}**: {subtask.get('description', 'No description')}\n"
+                for subtask in ai_result["subtasks"]
+            )
 
-        return comment_text
+        return "".join(parts)
 
     def _summarize_improvements(self, ai_result: Dict) -> Dict:
         """Summarize what improvements were made"""
+        # () is interned, so the miss path allocates nothing (the old
+        # [] defaults built a throwaway list per missing key)
         return {
             "summary_updated": bool(ai_result.get("new_summary")),
             "description_enhanced": bool(ai_result.get("new_description")),
-            "acceptance_criteria_added": len(ai_result.get("acceptance_criteria", [])),
-            "labels_suggested": len(ai_result.get("labels", [])),
+            "acceptance_criteria_added": len(ai_result.get("acceptance_criteria") or ()),
+            "labels_suggested": len(ai_result.get("labels") or ()),
             "estimate_provided": bool(ai_result.get("estimate")),
-            "subtasks_suggested": len(ai_result.get("subtasks", []))
+            "subtasks_suggested": len(ai_result.get("subtasks") or ())
         }
 
     def _create_error_response(self, issue_key: str, error: str) -> Dict:
@@ -390,5 +517,5 @@ Focus on clarity, actionability, and completeness. If critical information is mi
             "issueKey": issue_key,
             "mode_detected": "pm_enhancer",
             "error": error,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": iso_now_cached()
         }
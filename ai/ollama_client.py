@@ -10,6 +10,7 @@ import re
 from typing import Dict, Any
 
 from config import Config
+from ai.semantic_cache import response_cache
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -17,15 +18,28 @@ logger = get_logger(__name__)
 def call_ollama(prompt: str, system_prompt: str, config: Config) -> Dict:
     """Call local Ollama with improved timeout and fallback"""
     try:
-        # Build full prompt
-        full_prompt = f"{system_prompt}\n\nAnalyze this request and return ONLY valid JSON:\n{prompt}"
-        
+        # Near-identical prompts (recurring violation patterns, duplicate admin
+        # asks) skip the LLM round-trip entirely. Safe because generation runs
+        # at temperature 0.1 — repeat outputs are effectively deterministic.
+        cached = response_cache.get(system_prompt, prompt)
+        if cached is not None:
+            logger.info("Semantic cache hit - skipping Ollama call")
+            return cached
+
+        # Keep the static system prompt as a separate, stable prefix (Ollama's
+        # native "system" field) so the backend can reuse its prompt/KV cache
+        # across calls — only the per-issue request varies. Providers with
+        # explicit prompt caching (Anthropic/OpenAI) get the same stable-prefix
+        # benefit if the backend is ever swapped.
+        full_prompt = f"Analyze this request and return ONLY valid JSON:\n{prompt}"
+
         logger.info(f"Calling Ollama model: {config.model}")
-        logger.debug(f"Prompt length: {len(full_prompt)} chars")
-        
+        logger.debug(f"Prompt length: {len(system_prompt) + len(full_prompt)} chars")
+
         # Optimized parameters for speed vs quality
         payload = {
             "model": config.model,
+            "system": system_prompt,
             "prompt": full_prompt,
             "stream": False,
             "options": {
@@ -70,7 +84,9 @@ def call_ollama(prompt: str, system_prompt: str, config: Config) -> Dict:
                 if not parsed.get("plan") or not isinstance(parsed["plan"], list):
                     logger.warning("Missing or invalid plan in response")
                     return _get_structured_fallback(prompt, "missing_plan")
-            
+
+            # Only genuine model output gets cached (never fallbacks)
+            response_cache.put(system_prompt, prompt, parsed)
             return parsed
             
         except json.JSONDecodeError as e:
@@ -0,0 +1,113 @@
+"""
+Semantic response cache - Skip repeat LLM round-trips for near-identical prompts
+Recurring tickets (same violations, same admin asks) hit the cache instead of Ollama
+"""
+
+import copy
+import hashlib
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+SIMILARITY_THRESHOLD = 0.95
+DEFAULT_TTL_SECONDS = 15 * 60
+DEFAULT_MAX_ENTRIES = 256
+
+
+def _tokenize(text: str) -> frozenset:
+    """Normalize a prompt into a token set for similarity matching"""
+    return frozenset(_WORD_RE.findall(text.lower()))
+
+
+def _similarity(a: frozenset, b: frozenset) -> float:
+    """Jaccard similarity between two token sets.
+
+    The union size is derived from the intersection count, so each
+    comparison allocates one set instead of two.
+    """
+    if not a or not b:
+        return 0.0
+    inter = len(a & b)
+    return inter / (len(a) + len(b) - inter)
+
+
+class SemanticCache:
+    """TTL-bounded response cache keyed on system prompt + prompt similarity.
+
+    Prompts are matched by Jaccard similarity over normalized token sets — a
+    dependency-free stand-in for embedding cosine similarity that still
+    collapses the "same violations, different issue key" pattern. Entries are
+    partitioned by a hash of the system prompt so agents never share hits.
+    """
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD,
+                 ttl_seconds: int = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # system-prompt hash -> list of (token_set, response, stored_at)
+        self._entries: Dict[str, List[Tuple[frozenset, Dict, float]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _partition_key(self, system_prompt: str) -> str:
+        return hashlib.sha256((system_prompt or "").encode()).hexdigest()
+
+    def get(self, system_prompt: str, prompt: str) -> Optional[Dict]:
+        """Return a cached response for a sufficiently similar prompt, if any"""
+        key = self._partition_key(system_prompt)
+        tokens = _tokenize(prompt)
+        now = time.time()
+
+        with self._lock:
+            entries = self._entries.get(key, [])
+            live = [e for e in entries if now - e[2] < self.ttl_seconds]
+            if len(live) != len(entries):
+                self._entries[key] = live
+
+            best = None
+            best_score = self.threshold
+            n_tokens = len(tokens)
+            for entry_tokens, response, _ in live:
+                # Integer size bound: Jaccard is at most min/max of the set
+                # sizes, so entries too different in size skip the set
+                # intersection entirely
+                n_entry = len(entry_tokens)
+                if min(n_tokens, n_entry) < best_score * max(n_tokens, n_entry):
+                    continue
+                score = _similarity(tokens, entry_tokens)
+                if score >= best_score:
+                    best = response
+                    best_score = score
+
+            if best is not None:
+                self.hits += 1
+                return copy.deepcopy(best)
+            self.misses += 1
+            return None
+
+    def put(self, system_prompt: str, prompt: str, response: Dict) -> None:
+        """Store a response; oldest entries are evicted past max_entries"""
+        key = self._partition_key(system_prompt)
+        tokens = _tokenize(prompt)
+
+        with self._lock:
+            entries = self._entries.setdefault(key, [])
+            entries.append((tokens, copy.deepcopy(response), time.time()))
+            if len(entries) > self.max_entries:
+                del entries[: len(entries) - self.max_entries]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Shared process-wide cache used by call_ollama
+response_cache = SemanticCache()
@@ -5,10 +5,16 @@ Loads settings from environment variables with sensible defaults
 
 import os
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional
 
+# O(1) hashed membership for env-flag parsing
+_TRUTHY = frozenset({"true", "1", "yes", "on"})
 
-@dataclass
+
+# slots drops per-instance __dict__ (fixed-slot attribute loads), frozen
+# makes instances safely shareable from the cached get_config()
+@dataclass(slots=True, frozen=True)
 class Config:
     """Configuration settings for the Jira AI Agent"""
 
@@ -27,6 +33,16 @@ class Config:
     model: str = "gpt-oss:20b"
     ollama_url: str = "http://127.0.0.1:11434/api/generate"
 
+    # Parallelism settings
+    async_workers: int = 5
+    # Cap on threads running blocking agent work (asyncio.to_thread);
+    # size to downstream capacity (Ollama/Jira), not request volume
+    max_agent_workers: int = 8
+
+    # Include full analysis payloads in webhook responses (debugging only;
+    # inflates response serialization on every call)
+    verbose_response: bool = False
+
     # Environment settings
     production: bool = False
     environment: str = "development"
@@ -39,8 +55,14 @@ class Config:
         return f"Config(jira_auth={mode}, model={self.model})"
 
 
+@lru_cache(maxsize=1)
 def get_config() -> Config:
-    """Load configuration from environment variables"""
+    """Load configuration from environment variables.
+
+    Cached for the process lifetime — the environment doesn't change after
+    startup, so request-time callers skip the env re-reads and warning
+    checks. Tests can reset with get_config.cache_clear().
+    """
 
     # Load environment variables
     jira_base_url = os.getenv("JIRA_BASE_URL", "").rstrip("/")
@@ -66,9 +88,20 @@ def get_config() -> Config:
     model = os.getenv("MODEL", "gpt-oss:20b")
     ollama_url = os.getenv("OLLAMA_URL", "http://127.0.0.1:11434/api/generate")
 
+    try:
+        async_workers = int(os.getenv("ASYNC_WORKERS", "5"))
+    except ValueError:
+        async_workers = 5
+
+    try:
+        max_agent_workers = int(os.getenv("MAX_AGENT_WORKERS", "8"))
+    except ValueError:
+        max_agent_workers = 8
+
+    verbose_response = os.getenv("VERBOSE_RESPONSE", "false").lower() in _TRUTHY
+
     # Environment settings
-    production_str = os.getenv("PRODUCTION", "false").lower()
-    production = production_str in ("true", "1", "yes", "on")
+    production = os.getenv("PRODUCTION", "false").lower() in _TRUTHY
 
     environment = os.getenv("ENVIRONMENT", "development")
     if production:
@@ -90,6 +123,9 @@ def get_config() -> Config:
         webhook_secret=webhook_secret,
         model=model,
         ollama_url=ollama_url,
+        async_workers=async_workers,
+        max_agent_workers=max_agent_workers,
+        verbose_response=verbose_response,
         production=production,
         environment=environment,
     )
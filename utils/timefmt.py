@@ -0,0 +1,40 @@
+"""
+Timestamp helpers - Cached ISO formatting for high-volume result dicts
+"""
+
+import time
+from datetime import datetime
+
+_last_time = 0.0
+_last_iso = ""
+
+_last_minute = -1
+_last_minute_str = ""
+
+
+def iso_now_cached() -> str:
+    """Return an ISO-8601 timestamp, re-formatted at most ~twice a second.
+
+    Result dicts only need second-level resolution, so bulk sweeps skip the
+    per-call datetime construction and ISO string build.
+    """
+    global _last_time, _last_iso
+    now = time.time()
+    if not _last_iso or now - _last_time > 0.5:
+        _last_time = now
+        _last_iso = datetime.now().isoformat()
+    return _last_iso
+
+
+def minute_now_cached() -> str:
+    """Return 'YYYY-MM-DD HH:MM' for the current minute, formatted once.
+
+    Comment footers only show minute resolution, so bursts of comments in
+    the same minute reuse one strftime result.
+    """
+    global _last_minute, _last_minute_str
+    minute = int(time.time()) // 60
+    if minute != _last_minute:
+        _last_minute = minute
+        _last_minute_str = time.strftime("%Y-%m-%d %H:%M")
+    return _last_minute_str